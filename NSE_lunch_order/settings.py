@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
+
+from .database import database_from_env, replica_from_env
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,7 +35,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # django.contrib.admin（管理画面トップを lunch.admin_site.MyAdminSite にしたもの）
+    "lunch.apps.LunchAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -48,14 +52,79 @@ INSTALLED_APPS = [
 # ALLAUTH 用のサイトID を指定
 SITE_ID = 1
 
+# キャッシュ。REDIS_URL（例: redis://localhost:6379/0）を指定すると全ワーカーで共有する
+# Redis（redis パッケージが必要）、未指定ならプロセス内（LocMemCache）。idempotency は toggle_order の冪等キーと
+# 応答の保持用で、LocMemCache では件数の上限を超えると古いものから消える
+REDIS_URL = os.environ.get('REDIS_URL') or None
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+        "idempotency": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "idempotency",
+            "TIMEOUT": 600,
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "idempotency": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "lunch-idempotency",
+            "TIMEOUT": 600,
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        },
+    }
+
 # 認証バックエンドなど他の設定…
-AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    'allauth.account.auth_backends.AuthenticationBackend',
-]
+# LUNCH_CACHED_AUTH=1 ではログイン中ユーザーをキャッシュから取得し、
+# リクエストごとの auth_user の SELECT を省く（lunch/auth_backends.py）。
+# ログアウト・パスワード変更・無効化時の破棄はそのワーカーのキャッシュにしか届かないので、
+# 共有キャッシュ（REDIS_URL）があるときだけ使える（既定もそのときだけ有効）
+LUNCH_CACHED_AUTH = os.environ.get('LUNCH_CACHED_AUTH', '1' if REDIS_URL else '0') == '1'
+LUNCH_USER_CACHE_TTL = 300
+if LUNCH_CACHED_AUTH and not REDIS_URL:
+    raise ImproperlyConfigured('LUNCH_CACHED_AUTH=1 には共有キャッシュ（REDIS_URL）が必要です')
+if LUNCH_CACHED_AUTH:
+    AUTHENTICATION_BACKENDS = [
+        'lunch.auth_backends.CachedModelBackend',
+        'lunch.auth_backends.CachedAllauthBackend',
+    ]
+else:
+    AUTHENTICATION_BACKENDS = [
+        'django.contrib.auth.backends.ModelBackend',
+        'allauth.account.auth_backends.AuthenticationBackend',
+    ]
+
+# セッション: 共有キャッシュがあれば cached_db（キャッシュ優先で DB は書き込み時のみ）、
+# 無ければ db。cache / cached_db はログアウトが他のワーカーに届かないので LocMemCache では使えない。
+# signed_cookies はサーバー側の保存自体を行わない。
+# 注文系エンドポイントの 1 リクエストあたりのクエリ数（ログイン済み・ウォームアップ後）:
+#                                 db + 通常認証   cached_db / signed_cookies + キャッシュ認証
+#   today_order (GET)                   3                 1
+#   monthly_calendar                    3                 1
+#   toggle_order (POST, 既存の注文)     4                 2
+#   toggle_order (POST, 新規作成)       6                 4
+SESSION_ENGINE = os.environ.get(
+    'LUNCH_SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+if not REDIS_URL and SESSION_ENGINE in (
+    'django.contrib.sessions.backends.cache', 'django.contrib.sessions.backends.cached_db',
+):
+    raise ImproperlyConfigured(f'{SESSION_ENGINE} には共有キャッシュ（REDIS_URL）が必要です')
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # HTML などの動的レスポンスを gzip 圧縮（静的ファイルは collectstatic 時に圧縮済み、
+    # SSE は配信が遅れるので圧縮しない）
+    "lunch.compression.GZipMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -63,6 +132,10 @@ MIDDLEWARE = [
     "allauth.account.middleware.AccountMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # 重いダウンロードの同時実行数を制限（lunch/concurrency.py）
+    "lunch.concurrency.ConcurrencyLimitMiddleware",
+    # LUNCH_PROFILE_DIR 未設定時は読み込まれない（lunch/profiling.py）
+    "lunch.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "NSE_lunch_order.urls"
@@ -71,8 +144,19 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         'DIRS': [ BASE_DIR / 'templates' ],   # ← これが必須
-        "APP_DIRS": True,
+        # loaders を明示するため APP_DIRS は使わない（app_directories.Loader で同等）
+        "APP_DIRS": False,
         "OPTIONS": {
+            # コンパイル済みテンプレートをプロセス内に保持する（DEBUG 時は変更を検知して再読込）
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
@@ -88,12 +172,17 @@ WSGI_APPLICATION = "NSE_lunch_order.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# 接続先は環境変数 DATABASE_URL で指定（未指定なら db.sqlite3）。詳細は database.py
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_from_env(BASE_DIR),
 }
+# REPLICA_DATABASE_URL を指定したときだけ、レポート・エクスポート用の読み取りレプリカを追加
+replica_db = replica_from_env(BASE_DIR)
+if replica_db:
+    DATABASES["replica"] = replica_db
+DATABASE_ROUTERS = ["lunch.db_router.ReplicaRouter"]
+# False にするとレプリカがあっても使わず、すべて default から読む
+LUNCH_USE_REPLICA = os.environ.get('LUNCH_USE_REPLICA', '1') == '1'
 
 
 # Password validation
@@ -135,6 +224,24 @@ STATIC_URL = "/static/"
 STATICFILES_DIRS = [
         os.path.join(BASE_DIR, "static"), 
 ]
+# collectstatic の出力先
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# 本番ではハッシュ付きファイル名＋gzip/brotli 圧縮版を collectstatic 時に作成し、
+# urls.py の serve_static が Cache-Control: immutable 付きで配信する
+if not DEBUG:
+    STORAGES = {
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+        },
+        "staticfiles": {
+            "BACKEND": "lunch.staticfiles.CompressedManifestStaticFilesStorage",
+        },
+    }
+
+# バックグラウンドジョブの出力ファイル保存先（配信は jobs/<id>/download/ 経由のみ）
+MEDIA_ROOT = BASE_DIR / "media"
+MEDIA_URL = "/media/"
 
 # ログイン後は /order/（今日の注文画面）へ飛ばす
 LOGIN_REDIRECT_URL = '/order/'
@@ -143,3 +250,77 @@ LOGIN_REDIRECT_URL = '/order/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# 営業日カレンダー（lunch/business_calendar.py）
+# 注文を受け付けない曜日（0=月 … 6=日）。祝日と管理画面の「休業日」も休みになる
+LUNCH_CLOSED_WEEKDAYS = (6,)
+LUNCH_USE_JP_HOLIDAYS = True
+# 休業日の変更が他ワーカーのキャッシュに反映されるまでの秒数
+LUNCH_CALENDAR_TTL = 300
+# カレンダー・レポートで受け付ける年（今年 ± この年数）。範囲外は 400 / 404
+LUNCH_CALENDAR_YEAR_SPAN = 5
+
+# 注文ダッシュボード（lunch/events.py）
+# 複数ワーカー構成では共有ディレクトリを指定すると、ワーカー間で変更通知を配る
+LUNCH_EVENT_BUS_DIR = os.environ.get('LUNCH_EVENT_BUS_DIR') or None
+# 集計の最短間隔（秒）。この間の変更はまとめて 1 回の集計になる
+LUNCH_DASHBOARD_MIN_INTERVAL = 0.5
+# 変更通知が無くても集計し直すまでの秒数（別ワーカーや通知しない経路の変更を拾う）
+LUNCH_DASHBOARD_SNAPSHOT_TTL = 5
+
+# 月次レポート（Excel）のディスクキャッシュ。合計サイズが上限を超えたら古い順に削除
+LUNCH_REPORT_CACHE_DIR = os.environ.get('LUNCH_REPORT_CACHE_DIR') or BASE_DIR / "cache" / "reports"
+LUNCH_REPORT_CACHE_MAX_BYTES = int(os.environ.get('LUNCH_REPORT_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+# 注文の変更履歴（lunch/audit.py）。'db' は OrderAuditLog、'jsonl' は LUNCH_AUDIT_FILE へ追記
+LUNCH_AUDIT_BACKEND = os.environ.get('LUNCH_AUDIT_BACKEND', 'db')
+LUNCH_AUDIT_FILE = os.environ.get('LUNCH_AUDIT_FILE') or str(BASE_DIR / "logs" / "order_audit.jsonl")
+# 書き出し間隔（秒）と、間隔を待たずに書き出す件数
+LUNCH_AUDIT_FLUSH_INTERVAL = 5
+LUNCH_AUDIT_BATCH_SIZE = 200
+
+# スタッフ用のリクエストプロファイル（lunch/profiling.py）。保存先を指定したときだけ有効
+LUNCH_PROFILE_DIR = os.environ.get('LUNCH_PROFILE_DIR') or None
+LUNCH_PROFILE_KEEP = 50
+# bench_startup コマンドの予算。ワーカー起動時の import 時間（ミリ秒）と最大 RSS（MB）。超えたら失敗
+LUNCH_STARTUP_IMPORT_BUDGET_MS = 800
+LUNCH_STARTUP_RSS_BUDGET_MB = 96
+
+# 生成ジョブ（lunch/jobs.py）。実行中のまま LUNCH_JOB_LEASE 秒応答の無いジョブは
+# ワーカーが落ちたものとみなして待機中に戻す（LUNCH_JOB_MAX_ATTEMPTS 回で失敗扱い）。
+# 終わったジョブと出力ファイルは LUNCH_JOB_RETENTION_DAYS 日で削除する
+LUNCH_JOB_LEASE = 600
+LUNCH_JOB_MAX_ATTEMPTS = 3
+LUNCH_JOB_RETENTION_DAYS = 7
+
+# 管理画面トップの集計（lunch/admin_widgets.py）をキャッシュする秒数
+LUNCH_ADMIN_WIDGET_TTL = 60
+
+# メール送信。既定はコンソール出力（本番は EMAIL_BACKEND と SMTP の設定を環境変数で渡す）
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH') or str(BASE_DIR / "logs" / "mail")
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'lunch@localhost')
+
+# 注文リマインダー（lunch/reminders.py）。メール本文のリンク先、1 回にまとめて送る通数、毎秒の上限通数
+LUNCH_SITE_URL = os.environ.get('LUNCH_SITE_URL', '').rstrip('/')
+LUNCH_REMINDER_BATCH_SIZE = 50
+LUNCH_REMINDER_RATE = 10
+
+# 重いダウンロードの同時実行数（lunch/concurrency.py）。値はプロセスあたり
+# ワーカーが同時に処理するリクエスト数（gunicorn の threads 等に合わせる）と、そのうち注文系に残す枠
+LUNCH_WORKER_CONCURRENCY = int(os.environ.get('LUNCH_WORKER_CONCURRENCY', '8'))
+LUNCH_RESERVED_CONCURRENCY = 2
+LUNCH_RESERVED_VIEWS = ('toggle_order', 'today_order', 'monthly_calendar')
+# 重いビュー（URL 名）の同時実行数（0 で制限しない）、待てる件数、待つ秒数
+LUNCH_HEAVY_VIEWS = ('download_monthly_report', 'fax_order_pdf', 'fax_order_excel')
+LUNCH_HEAVY_CONCURRENCY = int(os.environ.get('LUNCH_HEAVY_CONCURRENCY', '2'))
+LUNCH_HEAVY_QUEUE = 4
+LUNCH_HEAVY_TIMEOUT = 10
+# 接続中ずっとスレッドを使うストリーミングのビュー（SSE）と、その同時接続数（超えたら 503）
+LUNCH_STREAM_VIEWS = ('order_dashboard_stream',)
+LUNCH_STREAM_CONCURRENCY = 2
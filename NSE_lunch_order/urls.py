@@ -15,13 +15,25 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.views.generic import RedirectView
-from django.urls import path, include
-from lunch.views import fax_order_pdf, today_order, monthly_calendar, toggle_order, fax_order_excel
+from django.urls import path, re_path, include
+from lunch.views import (
+    fax_order_pdf, today_order, monthly_calendar, toggle_order, fax_order_excel,
+    year_calendar, year_orders, order_history, order_history_api,
+    order_dashboard, order_dashboard_stream,
+    enqueue_job, job_status, job_download,
+    profile_list, profile_download, download_monthly_report,
+)
+from lunch.staticfiles import serve_static
 
 urlpatterns = [
     path('', RedirectView.as_view(url='accounts/login/')),
+    # 事務用: リクエストプロファイルの一覧（admin.site.urls より先に置く）
+    path('admin/profiles/', profile_list, name='profile_list'),
+    re_path(r'^admin/profiles/(?P<name>[\w.-]+)\.(?P<ext>prof|txt)$', profile_download,
+            name='profile_download'),
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
 
@@ -31,8 +43,32 @@ urlpatterns = [
     # 今月表示と年月指定のいずれも同じビューを同じ名前で扱う
     path('calendar/',                    monthly_calendar, name='monthly_calendar'),
     path('calendar/<int:year>/<int:month>/', monthly_calendar, name='monthly_calendar'),
+    path('calendar/year/',            year_calendar, name='year_calendar'),
+    path('calendar/year/<int:year>/', year_calendar, name='year_calendar'),
 
     path('api/toggle-order/', toggle_order, name='toggle_order'),
+    path('api/year-orders/<int:year>/', year_orders, name='year_orders'),
+    path('history/',     order_history,     name='order_history'),
+    path('api/orders/',  order_history_api, name='order_history_api'),
 
-    path('excel-order/', fax_order_excel, name='fax_order_excel')
+    path('excel-order/', fax_order_excel, name='fax_order_excel'),
+
+    # 事務用: 月次レポート（?year=&month= でも指定可）
+    path('report/',                          download_monthly_report, name='download_monthly_report'),
+    path('report/<int:year>/<int:month>/',   download_monthly_report, name='download_monthly_report'),
+
+    # 事務用: 当日の注文数のリアルタイム表示（SSE）
+    path('dashboard/',        order_dashboard,        name='order_dashboard'),
+    path('dashboard/stream/', order_dashboard_stream, name='order_dashboard_stream'),
+
+    # 事務用: レポート・FAX のバックグラウンド生成（run_lunch_worker が処理）
+    path('jobs/',                        enqueue_job,  name='enqueue_job'),
+    path('jobs/<int:job_id>/',           job_status,   name='job_status'),
+    path('jobs/<int:job_id>/download/',  job_download, name='job_download'),
 ]
+
+# 本番（DEBUG=False）では collectstatic 済みのファイルを圧縮版・長期キャッシュ付きで配信
+if not settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static),
+    ]
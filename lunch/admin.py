@@ -1,28 +1,221 @@
-from django.contrib import admin
-from django.urls import reverse
-from .models import LunchConfig, Order
-from django.contrib.admin import AdminSite
+import calendar
+import io
+from datetime import date
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import F
+from django.shortcuts import redirect, render
+from django.urls import path
+from .models import (
+    LunchConfig, Order, Holiday, DailyOrderCounter, MonthlyDataVersion, ReportJob, StandingOrder,
+    OrderAuditLog, PriceRule,
+)
+from . import audit
+from .events import order_events
+from .importers import import_orders_csv
+from .reconciliation import iter_csv_rows, iter_xlsx_rows, reconcile_invoice
 
 @admin.register(LunchConfig)
 class LunchConfigAdmin(admin.ModelAdmin):
     list_display = ('price', 'subsidy', 'monthly_limit')
     ordering     = ('-id',)
 
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ('effective_from', 'vendor', 'price', 'subsidy', 'monthly_limit')
+    list_filter  = ('vendor',)
+    ordering     = ('-effective_from', 'vendor')
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display  = ('user', 'order_date', 'vendor', 'rice_size', 'quantity', 'price', 'subsidy', 'canceled')
     list_filter   = ('order_date', 'vendor', 'rice_size', 'canceled')
     search_fields = ('user__username',)
+    # version は楽観的排他用なので手で変えさせない（保存時に +1 する）
+    readonly_fields = ('version',)
+
+    # 管理画面での編集は件数が少ないので、変更のあった日の日別注文数を作り直す
+    def save_model(self, request, obj, form, change):
+        old_date  = form.initial.get('order_date') if change else None
+        old_state = ('canceled' if form.initial.get('canceled') else 'ordered') if change else 'none'
+        super().save_model(request, obj, form, change)
+        if change:
+            # 画面の古い version で送ってくる toggle_order を 409 にする
+            Order.objects.filter(pk=obj.pk).update(version=F('version') + 1)
+            obj.refresh_from_db(fields=['version'])
+        if old_state != audit.state_of(obj):
+            audit.record(obj, old_state, audit.state_of(obj), 'admin', request.user)
+        DailyOrderCounter.rebuild(obj.order_date)
+        order_events.publish_after_commit(obj.order_date)
+        if old_date and old_date != obj.order_date:
+            DailyOrderCounter.rebuild(old_date)
+            MonthlyDataVersion.bump(old_date)
+            order_events.publish_after_commit(old_date)
+
+    def delete_model(self, request, obj):
+        audit.record(obj, audit.state_of(obj), 'deleted', 'admin', request.user)
+        super().delete_model(request, obj)   # 日別注文数は post_delete で引かれる
+        order_events.publish_after_commit(obj.order_date)
+
+    def delete_queryset(self, request, queryset):
+        orders = list(queryset)
+        dates  = {o.order_date for o in orders}
+        for o in orders:
+            audit.record(o, audit.state_of(o), 'deleted', 'admin', request.user)
+        super().delete_queryset(request, queryset)
+        for d in dates:
+            order_events.publish_after_commit(d)
+
+    # ── CSV 一括取り込み（一覧画面の「CSV 取り込み」ボタンから） ──
+    def get_urls(self):
+        urls = [
+            path('import-csv/', self.admin_site.admin_view(self.import_csv_view),
+                 name='lunch_order_import_csv'),
+            path('reconcile-invoice/', self.admin_site.admin_view(self.reconcile_invoice_view),
+                 name='lunch_order_reconcile_invoice'),
+        ]
+        return urls + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:lunch_order_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts':  self.model._meta,
+            'title': '注文の CSV 取り込み',
+        }
+        if request.method == 'POST' and request.FILES.get('file'):
+            encoding = 'cp932' if request.POST.get('encoding') == 'cp932' else 'utf-8-sig'
+            # アップロードファイルを 1 行ずつ読む（全体を文字列にしない）
+            lines = io.TextIOWrapper(request.FILES['file'].file, encoding=encoding, newline='')
+            try:
+                result = import_orders_csv(lines)
+            except UnicodeDecodeError:
+                messages.error(request, f'文字コードが {encoding} ではありません')
+            else:
+                messages.success(request, f'{result.written} 件を取り込みました')
+                if result.errors:
+                    messages.warning(request, f'{len(result.errors)} 行は取り込めませんでした')
+                context['errors'] = result.errors[:200]
+                context['error_count'] = len(result.errors)
+        return render(request, 'admin/lunch/order/import_csv.html', context)
+
+    # ── 請求書の照合（一覧画面の「請求書照合」ボタンから） ──
+    def reconcile_invoice_view(self, request):
+        if not self.has_view_permission(request):
+            return redirect('admin:index')
+        today = date.today()
+        context = {
+            **self.admin_site.each_context(request),
+            'opts':    self.model._meta,
+            'title':   '請求書の照合',
+            'vendors': Order.VENDORS,
+            'year':    today.year,
+            'month':   today.month,
+        }
+        upload = request.FILES.get('file')
+        if request.method == 'POST' and upload:
+            vendor = request.POST.get('vendor')
+            try:
+                y = int(request.POST.get('year', ''))
+                m = int(request.POST.get('month', ''))
+                start, end = date(y, m, 1), date(y, m, calendar.monthrange(y, m)[1])
+            except ValueError:
+                messages.error(request, '年月が不正です')
+                return render(request, 'admin/lunch/order/reconcile_invoice.html', context)
+            if vendor not in dict(Order.VENDORS):
+                messages.error(request, 'ベンダーを選んでください')
+                return render(request, 'admin/lunch/order/reconcile_invoice.html', context)
+            if upload.name.lower().endswith('.xlsx'):
+                rows = iter_xlsx_rows(upload.file)
+            else:
+                encoding = 'cp932' if request.POST.get('encoding') == 'cp932' else 'utf-8-sig'
+                rows = iter_csv_rows(io.TextIOWrapper(upload.file, encoding=encoding, newline=''))
+            try:
+                result = reconcile_invoice(rows, vendor, start, end)
+            except UnicodeDecodeError:
+                messages.error(request, '文字コードが正しくありません')
+            except Exception as e:   # 壊れた XLSX など
+                messages.error(request, f'請求書を読み込めません: {e}')
+            else:
+                context['result'] = result
+                context['vendor_label'] = dict(Order.VENDORS)[vendor]
+            context.update(year=y, month=m, vendor=vendor)
+        return render(request, 'admin/lunch/order/reconcile_invoice.html', context)
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name')
+    date_hierarchy = 'date'
+
+@admin.register(DailyOrderCounter)
+class DailyOrderCounterAdmin(admin.ModelAdmin):
+    list_display   = ('date', 'vendor', 'rice_size', 'count')
+    list_filter    = ('vendor', 'rice_size')
+    date_hierarchy = 'date'
+
+    # 値は注文から自動で集計されるので手入力はさせない
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display    = ('id', 'kind', 'status', 'progress', 'created_by', 'created_at', 'finished_at')
+    list_filter     = ('kind', 'status')
+    readonly_fields = ('worker', 'started_at', 'heartbeat_at', 'attempts', 'finished_at', 'error')
 
-class MyAdminSite(AdminSite):
-    site_header = "NSランチ管理"
-    def index(self, request, extra_context=None):
-        if extra_context is None:
-            extra_context = {}
 
-            report_url = reverse('download_monthly_report')
-            extra_context['report_link'] = format_html(
-                '<a class="button" href="{}">月末レポートダウンロード</a>', report_url
-            )
-            return super().index(request, extra_context=extra_context)
+@admin.register(OrderAuditLog)
+class OrderAuditLogAdmin(admin.ModelAdmin):
+    list_display   = ('created_at', 'actor', 'order_user_id', 'order_date', 'vendor', 'rice_size',
+                      'old_state', 'new_state', 'source')
+    list_filter    = ('source', 'new_state')
+    search_fields  = ('actor',)
+    date_hierarchy = 'created_at'
+
+    # 追記のみ（画面からの追加・変更・削除は不可）
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class StandingOrderForm(forms.ModelForm):
+    # ビットマスクの weekdays を曜日のチェックボックスで編集する
+    weekdays = forms.TypedMultipleChoiceField(
+        label="曜日",
+        choices=[(str(i), w) for i, w in enumerate(StandingOrder.WEEKDAYS)],
+        coerce=int,
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model  = StandingOrder
+        fields = ('user', 'weekdays', 'vendor', 'rice_size', 'quantity', 'start_date', 'end_date', 'active')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        mask = self.initial.get('weekdays') or 0
+        if isinstance(mask, int):
+            self.initial['weekdays'] = [str(i) for i in range(7) if mask & (1 << i)]
+
+    def clean_weekdays(self):
+        return sum(1 << i for i in self.cleaned_data['weekdays'])
+
+@admin.register(StandingOrder)
+class StandingOrderAdmin(admin.ModelAdmin):
+    form          = StandingOrderForm
+    list_display  = ('user', 'weekday_label', 'vendor', 'rice_size', 'quantity', 'start_date', 'end_date', 'active')
+    list_filter   = ('active', 'vendor')
+    search_fields = ('user__username',)
+
+    @admin.display(description="曜日")
+    def weekday_label(self, obj):
+        return obj.weekday_label()
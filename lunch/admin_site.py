@@ -0,0 +1,36 @@
+"""
+管理画面のサイト（apps.LunchAdminConfig で admin.site として使う）。
+
+admin.py のモデル登録が admin.site を参照した時点でこのクラスが読み込まれるため、
+admin.py とは別のモジュールに置いている。
+"""
+from datetime import date
+
+from django.contrib.admin import AdminSite
+from django.urls import reverse
+from django.utils.html import format_html
+
+from . import admin_widgets
+
+
+class MyAdminSite(AdminSite):
+    """管理画面トップに当日・今月の集計とレポートへのリンクを出す"""
+    site_header = "NSランチ管理"
+
+    def index(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        today = date.today()
+        month = admin_widgets.month_widget()
+        extra_context.update({
+            'today_widget': admin_widgets.today_widget(),
+            'month_widget': month,
+            # templates/admin/index.html で使う
+            'monthly_subsidy_total': month['subsidy_total'],
+            'users_over_limit_count': month['users_over_limit'],
+            'report_link': format_html(
+                '<a class="button" href="{}">月末レポートダウンロード（{}年{}月）</a>',
+                reverse('download_monthly_report', kwargs={'year': today.year, 'month': today.month}),
+                today.year, today.month,
+            ),
+        })
+        return super().index(request, extra_context=extra_context)
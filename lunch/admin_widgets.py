@@ -0,0 +1,78 @@
+"""
+管理画面トップ（MyAdminSite.index）に表示する集計。
+
+各ウィジェットは集計クエリ 1 回で計算し、LUNCH_ADMIN_WIDGET_TTL 秒キャッシュする
+（事務の方が何度トップを開いても、集計は TTL ごとに 1 回だけ）。
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .db_router import use_replica
+from .events import today_counts
+from .models import Order
+from .pricing import PriceTable
+
+
+def _cached(key, compute):
+    return cache.get_or_set(key, compute, getattr(settings, 'LUNCH_ADMIN_WIDGET_TTL', 60))
+
+
+def today_widget() -> dict:
+    """当日のベンダー別・ライスサイズ別の注文数（日別注文数テーブルへの 1 クエリ）"""
+    today = date.today()
+
+    def compute():
+        counts  = today_counts()
+        vendors = dict(Order.VENDORS)
+        return {
+            'date': today,
+            'total': counts['total'],
+            'vendors': [(vendors.get(code, code), n) for code, n in counts['vendors'].items()],
+            'rice_sizes': list(counts['rice_sizes'].items()),
+        }
+    return _cached(f'lunch:admin:today:{today:%Y%m%d}', compute)
+
+
+def month_widget() -> dict:
+    """
+    今月（今日まで）の注文数・金額・補助額と、上限を超えたユーザー数。
+    注文は (ユーザー, 日付, ベンダー) ごとの件数を GROUP BY する 1 クエリで取り、
+    金額は料金設定（pricing.py）で注文日ごとに引く。月次レポートと同じく
+    補助額は 1 日 1 食分、会社負担はユーザーごとに上限で打ち切る。
+    """
+    today = date.today()
+
+    # 月初からの全注文を読むのでレプリカから（TTL でキャッシュするため多少の遅れは問題にならない）
+    @use_replica()
+    def compute():
+        prices = PriceTable.load()
+        limit  = prices.monthly_limit(today.year, today.month)
+        rows = (
+            Order.objects.filter(
+                order_date__range=(today.replace(day=1), today), canceled=False,
+            )
+            .values_list('user_id', 'order_date', 'vendor')
+            .annotate(n=Count('id'))
+            .order_by('user_id', 'order_date', 'vendor')
+        )
+        orders  = 0
+        amount  = 0
+        subsidy = {}    # ユーザーID → {日付: 補助額}
+        for user_id, order_date, vendor, n in rows:
+            p = prices.resolve(order_date, vendor)
+            orders += n
+            amount += p.price * n
+            subsidy.setdefault(user_id, {}).setdefault(order_date, p.subsidy)
+        per_user = [sum(days.values()) for days in subsidy.values()]
+        return {
+            'orders': orders,
+            'amount': amount,
+            'subsidy_total': sum(min(s, limit) for s in per_user),
+            'users_over_limit': sum(1 for s in per_user if s > limit),
+            'users': len(per_user),
+            'limit': limit,
+        }
+    return _cached(f'lunch:admin:month:{today:%Y%m%d}', compute)
@@ -1,6 +1,33 @@
 from django.apps import AppConfig
+from django.contrib.admin import apps as admin_apps
 
 
 class LunchConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "lunch"
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from django.contrib.auth import get_user_model
+        from .auth_backends import invalidate_cached_user
+        from .business_calendar import invalidate_business_calendar
+        from .models import Holiday, Order, order_deleted
+        from .report_cache import order_changed, users_changed
+
+        post_save.connect(invalidate_business_calendar, sender=Holiday)
+        post_delete.connect(invalidate_business_calendar, sender=Holiday)
+        post_save.connect(invalidate_cached_user, sender=get_user_model())
+        post_delete.connect(invalidate_cached_user, sender=get_user_model())
+        # 月次レポートのキャッシュを無効にするためのデータバージョン
+        post_save.connect(order_changed, sender=Order)
+        post_delete.connect(order_changed, sender=Order)
+        post_save.connect(users_changed, sender=get_user_model())
+        post_delete.connect(users_changed, sender=get_user_model())
+        # 日別注文数（削除はどの経路からでもここで引く）
+        post_delete.connect(order_deleted, sender=Order)
+
+
+class LunchAdminConfig(admin_apps.AdminConfig):
+    """admin.site を集計つきトップの MyAdminSite にする（INSTALLED_APPS で django.contrib.admin の代わりに使う）"""
+    default = False   # 'lunch' アプリ自体の設定は LunchConfig
+    default_site = "lunch.admin_site.MyAdminSite"
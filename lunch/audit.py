@@ -0,0 +1,135 @@
+"""
+注文状態の変更履歴（監査ログ）。
+
+record() はコミット後にメモリ上のバッファへ 1 件追加するだけで、リクエスト中に
+書き込みは発生しない。バッファはワーカーごとのバックグラウンドスレッドが
+LUNCH_AUDIT_FLUSH_INTERVAL 秒ごと、または LUNCH_AUDIT_BATCH_SIZE 件溜まった時点で
+まとめて書き出す。書き出し先は LUNCH_AUDIT_BACKEND で選ぶ。
+
+    'db'     … OrderAuditLog に bulk_create（既定）
+    'jsonl'  … LUNCH_AUDIT_FILE に 1 行 1 件の JSON で追記
+
+プロセス終了時（atexit）にも残りを書き出すが、強制終了された場合は最大で
+書き出し間隔分の履歴が失われる。
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def state_of(order) -> str:
+    """注文（None 可）の状態を OrderAuditLog.STATES のコードで返す"""
+    if order is None:
+        return 'none'
+    return 'canceled' if order.canceled else 'ordered'
+
+
+def record(order, old_state, new_state, source, actor=None):
+    """
+    注文の状態変更を 1 件記録する。トランザクション中ならコミット後にバッファへ入る
+    （ロールバックされた変更は記録しない）。
+    """
+    entry = {
+        'created_at':    timezone.now(),
+        'actor_id':      actor.pk if actor is not None else None,
+        'actor':         actor.get_username() if actor is not None else '',
+        'order_id':      order.pk,
+        'order_user_id': order.user_id,
+        'order_date':    order.order_date,
+        'vendor':        order.vendor,
+        'rice_size':     order.rice_size,
+        'old_state':     old_state,
+        'new_state':     new_state,
+        'source':        source,
+    }
+    transaction.on_commit(lambda: audit_buffer.add(entry))
+
+
+def to_json(entry) -> str:
+    return json.dumps(
+        {k: v.isoformat() if hasattr(v, 'isoformat') else v for k, v in entry.items()},
+        ensure_ascii=False,
+    )
+
+
+def _write_db(entries):
+    from .models import OrderAuditLog
+
+    OrderAuditLog.objects.bulk_create([OrderAuditLog(**e) for e in entries])
+
+
+def _write_jsonl(entries):
+    path = settings.LUNCH_AUDIT_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = ''.join(to_json(e) + '\n' for e in entries)
+    # O_APPEND なので複数ワーカーから同時に追記しても行が混ざらない（1 回の write で書く）
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+    try:
+        os.write(fd, data.encode())
+    finally:
+        os.close(fd)
+
+
+WRITERS = {'db': _write_db, 'jsonl': _write_jsonl}
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._entries = []
+        self._wakeup  = threading.Event()
+        self._flusher = None
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            size = len(self._entries)
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name='lunch-audit', daemon=True
+                )
+                self._flusher.start()
+                atexit.register(self.flush)
+        if size >= getattr(settings, 'LUNCH_AUDIT_BATCH_SIZE', 200):
+            self._wakeup.set()
+
+    def _flush_loop(self):
+        interval = getattr(settings, 'LUNCH_AUDIT_FLUSH_INTERVAL', 5)
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """溜まっている履歴を書き出す（テストや管理コマンドからも呼べる）"""
+        with self._lock:
+            entries, self._entries = self._entries, []
+        if not entries:
+            return
+        writer = WRITERS[getattr(settings, 'LUNCH_AUDIT_BACKEND', 'db')]
+        try:
+            writer(entries)
+        except Exception:
+            logger.exception('注文の変更履歴 %d 件を書き出せませんでした', len(entries))
+            # 次回に再試行する。書き出せない状態が続いてもメモリを食い潰さないよう上限を設ける
+            limit = getattr(settings, 'LUNCH_AUDIT_MAX_PENDING', 10000)
+            with self._lock:
+                self._entries = (entries + self._entries)[-limit:]
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+audit_buffer = AuditBuffer()
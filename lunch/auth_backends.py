@@ -0,0 +1,44 @@
+"""
+ログイン中ユーザーの取得をキャッシュする認証バックエンド。
+
+@login_required のたびに auth_user を SELECT しないよう、get_user() の結果を
+Django のキャッシュに LUNCH_USER_CACHE_TTL 秒保持する。ユーザーの保存・削除時
+（パスワード変更や last_login 更新を含む）にはシグナルで即座に破棄する。
+
+破棄が全ワーカーに届くよう、共有キャッシュ（REDIS_URL）があるときだけ使う
+（settings.py の LUNCH_CACHED_AUTH。LocMemCache のままでは有効にできない）。
+"""
+from allauth.account.auth_backends import AuthenticationBackend
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'lunch:auth-user:{user_id}'
+
+
+class CachedUserMixin:
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = get_user_model()._default_manager.get(pk=user_id)
+            except get_user_model().DoesNotExist:
+                return None
+            cache.set(key, user, getattr(settings, 'LUNCH_USER_CACHE_TTL', 300))
+        return user if self.user_can_authenticate(user) else None
+
+
+class CachedModelBackend(CachedUserMixin, ModelBackend):
+    """django.contrib.auth.backends.ModelBackend のキャッシュ版（管理画面ログイン用）"""
+
+
+class CachedAllauthBackend(CachedUserMixin, AuthenticationBackend):
+    """allauth の AuthenticationBackend のキャッシュ版"""
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
@@ -0,0 +1,233 @@
+"""
+営業日カレンダー。
+
+曜日ルール（既定は日曜休み）と祝日・会社休業日から「注文可能日」を年単位で
+事前計算し、プロセス内にキャッシュする。日付の判定は set による O(1)、
+「○日以降の営業日 N 日分」は日付→インデックスの辞書でスライスを返すだけ。
+
+日本の祝日は外部サービスに頼らず、祝日法のルールからこのモジュール内で計算する。
+会社独自の休業日（年末年始など）は管理画面の「休業日」(Holiday) で登録する。
+
+画面・API で受け付ける年は year_window()（今年 ± LUNCH_CALENDAR_YEAR_SPAN 年）に限る。
+共有のカレンダーはこの範囲までしか広げず、範囲外の問い合わせはその都度計算して捨てる。
+"""
+import bisect
+import zlib
+import threading
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+
+
+# ── 日本の祝日（2020年以降のルール） ──
+
+def _nth_weekday(year, month, n, weekday=0):
+    """year年month月の第n weekday（0=月曜）"""
+    first = date(year, month, 1)
+    offset = (weekday - first.weekday()) % 7
+    return first + timedelta(days=offset + 7 * (n - 1))
+
+
+def _equinox(year, base):
+    # 1980〜2099 年に有効な春分・秋分日の近似式
+    return int(base + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def japanese_holidays(year: int) -> dict[date, str]:
+    """
+    year 年の日本の祝日（振替休日・国民の休日を含む）を {日付: 名称} で返す。
+    """
+    h = {
+        date(year, 1, 1):   '元日',
+        _nth_weekday(year, 1, 2): '成人の日',
+        date(year, 2, 11):  '建国記念の日',
+        date(year, 2, 23):  '天皇誕生日',
+        date(year, 3, _equinox(year, 20.8431)): '春分の日',
+        date(year, 4, 29):  '昭和の日',
+        date(year, 5, 3):   '憲法記念日',
+        date(year, 5, 4):   'みどりの日',
+        date(year, 5, 5):   'こどもの日',
+        _nth_weekday(year, 9, 3): '敬老の日',
+        date(year, 9, _equinox(year, 23.2488)): '秋分の日',
+        date(year, 11, 3):  '文化の日',
+        date(year, 11, 23): '勤労感謝の日',
+    }
+    # 東京オリンピック特措法による移動（2020・2021年）
+    moved = {
+        2020: (date(2020, 7, 23), date(2020, 7, 24), date(2020, 8, 10)),
+        2021: (date(2021, 7, 22), date(2021, 7, 23), date(2021, 8, 8)),
+    }
+    if year in moved:
+        umi, sports, yama = moved[year]
+    else:
+        umi    = _nth_weekday(year, 7, 3)
+        sports = _nth_weekday(year, 10, 2)
+        yama   = date(year, 8, 11)
+    h[umi]    = '海の日'
+    h[sports] = 'スポーツの日'
+    h[yama]   = '山の日'
+
+    # 国民の休日: 前後を祝日に挟まれた平日
+    for d in sorted(h):
+        between = d + timedelta(days=1)
+        if (d + timedelta(days=2)) in h and between not in h and between.weekday() != 6:
+            h[between] = '国民の休日'
+
+    # 振替休日: 祝日が日曜なら、その後最初の祝日でない日
+    for d in sorted(h):
+        if d.weekday() == 6:
+            sub = d + timedelta(days=1)
+            while sub in h:
+                sub += timedelta(days=1)
+            h[sub] = '振替休日'
+    return h
+
+
+# ── 営業日カレンダー本体 ──
+
+class _Span:
+    """BusinessCalendar の計算結果。拡張時は丸ごと差し替えるので読み取り側はロック不要"""
+    __slots__ = ('first_year', 'last_year', 'holidays', 'open_days', 'open_set', 'index')
+
+    def __init__(self, first_year, last_year, holidays, open_days, index):
+        self.first_year = first_year
+        self.last_year  = last_year
+        self.holidays   = holidays    # {date: 名称}（祝日＋会社休業日）
+        self.open_days  = open_days   # 営業日の昇順リスト
+        self.open_set   = set(open_days)
+        self.index      = index       # 各日付 → その日以降最初の営業日の open_days 上の位置
+
+
+class BusinessCalendar:
+    """
+    first_year〜last_year の営業日を事前計算したカレンダー。
+    範囲外の日付が問い合わせられた場合は自動で年単位に拡張する。
+    limits=(最初の年, 最後の年) を渡すとその範囲までしか拡張せず、
+    範囲外の年は問い合わせのたびに必要な年だけ計算する（保持しない）。
+    """
+
+    def __init__(self, closed_weekdays, closures, first_year, last_year, use_jp_holidays=True,
+                 limits=None):
+        self.closed_weekdays = frozenset(closed_weekdays)
+        self.closures        = dict(closures)   # 会社休業日 {date: 名称}
+        self.use_jp_holidays = use_jp_holidays
+        self.limits          = limits
+        # 休業日設定が同じなら全ワーカーで同じ値（テンプレートのキャッシュキーに使う）
+        self.version = zlib.crc32(repr((
+            sorted(self.closed_weekdays), sorted(self.closures.items()), use_jp_holidays,
+        )).encode())
+        self._span = self._build(first_year, last_year)
+
+    def _build(self, first_year, last_year):
+        holidays = {}
+        for y in range(first_year, last_year + 1):
+            if self.use_jp_holidays:
+                holidays.update(japanese_holidays(y))
+        holidays.update({
+            d: name for d, name in self.closures.items() if first_year <= d.year <= last_year
+        })
+
+        open_days, index, pending = [], {}, []
+        d, end = date(first_year, 1, 1), date(last_year, 12, 31)
+        while d <= end:
+            pending.append(d)
+            if d.weekday() not in self.closed_weekdays and d not in holidays:
+                for p in pending:
+                    index[p] = len(open_days)
+                pending = []
+                open_days.append(d)
+            d += timedelta(days=1)
+        for p in pending:
+            index[p] = len(open_days)
+        return _Span(first_year, last_year, holidays, open_days, index)
+
+    def _covering(self, *years):
+        span = self._span
+        lo, hi = min(years), max(years)
+        if lo < span.first_year or hi > span.last_year:
+            if self.limits and (lo < self.limits[0] or hi > self.limits[1]):
+                return self._build(lo, hi)
+            span = self._build(min(lo, span.first_year), max(hi, span.last_year))
+            self._span = span
+        return span
+
+    def is_open(self, d: date) -> bool:
+        """d が注文を受け付ける営業日か"""
+        return d in self._covering(d.year).open_set
+
+    def holiday_name(self, d: date) -> str:
+        """祝日・会社休業日ならその名称、そうでなければ空文字"""
+        return self._covering(d.year).holidays.get(d, '')
+
+    def next_open_days(self, start: date, count: int) -> list[date]:
+        """start 以降（start を含む）の営業日を count 日分返す"""
+        span = self._covering(start.year)
+        i = span.index[start]
+        while i + count > len(span.open_days):
+            span = self._covering(start.year, span.last_year + 1)
+            i = span.index[start]
+        return span.open_days[i:i + count]
+
+    def open_days_between(self, start: date, end: date) -> list[date]:
+        """start〜end（両端含む）の営業日"""
+        span = self._covering(start.year, end.year)
+        lo = bisect.bisect_left(span.open_days, start)
+        hi = bisect.bisect_right(span.open_days, end)
+        return span.open_days[lo:hi]
+
+
+def year_window() -> tuple[int, int]:
+    """画面・API で受け付ける年の範囲（今年 ± LUNCH_CALENDAR_YEAR_SPAN 年、両端含む）"""
+    span = getattr(settings, 'LUNCH_CALENDAR_YEAR_SPAN', 5)
+    this_year = date.today().year
+    return this_year - span, this_year + span
+
+
+def is_supported_year(year: int) -> bool:
+    first, last = year_window()
+    return first <= year <= last
+
+
+# ── プロセス内キャッシュ ──
+
+_lock     = threading.Lock()
+_calendar = None
+_built_at = 0.0
+
+
+def get_business_calendar() -> BusinessCalendar:
+    """
+    プロセス内で共有する BusinessCalendar を返す。
+    休業日を保存・削除したプロセスでは即座に作り直し、他のワーカーでも
+    LUNCH_CALENDAR_TTL 秒（既定 300 秒）以内に反映される。
+    """
+    global _calendar, _built_at
+    ttl = getattr(settings, 'LUNCH_CALENDAR_TTL', 300)
+    cal = _calendar
+    if cal is not None and time.monotonic() - _built_at < ttl:
+        return cal
+    with _lock:
+        if _calendar is None or time.monotonic() - _built_at >= ttl:
+            from .models import Holiday
+            # プロセス全体で共有するので、レポート生成中（レプリカ読み取り中）でも default から読む
+            closures = dict(Holiday.objects.using('default').values_list('date', 'name'))
+            this_year = date.today().year
+            first, last = year_window()
+            _calendar = BusinessCalendar(
+                closed_weekdays=getattr(settings, 'LUNCH_CLOSED_WEEKDAYS', (6,)),
+                closures=closures,
+                first_year=this_year - 1,
+                last_year=this_year + 1,
+                use_jp_holidays=getattr(settings, 'LUNCH_USE_JP_HOLIDAYS', True),
+                # 範囲の端の年でも翌年の営業日まで引けるよう 1 年ずつ余裕を持たせる
+                limits=(first - 1, last + 1),
+            )
+            _built_at = time.monotonic()
+        return _calendar
+
+
+def invalidate_business_calendar(**kwargs):
+    """Holiday の保存・削除時に呼ばれ、次回アクセスで再計算させる"""
+    global _calendar
+    _calendar = None
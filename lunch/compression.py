@@ -0,0 +1,15 @@
+"""
+動的レスポンスの gzip 圧縮。
+
+django.middleware.gzip.GZipMiddleware はストリーミングレスポンスも圧縮するが、
+Server-Sent Events（text/event-stream）を圧縮するとイベントが圧縮バッファに
+溜まってすぐに届かなくなるので、それだけは圧縮しない。
+"""
+from django.middleware.gzip import GZipMiddleware as DjangoGZipMiddleware
+
+
+class GZipMiddleware(DjangoGZipMiddleware):
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
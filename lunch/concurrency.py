@@ -0,0 +1,163 @@
+"""
+重いダウンロードの同時実行数を制限するミドルウェア。
+
+月次レポート・FAX（PDF / Excel）の生成は 1 件で数百 ms〜数秒ワーカーを占有するので、
+これらのビュー（LUNCH_HEAVY_VIEWS）はプロセスあたり LUNCH_HEAVY_CONCURRENCY 件までしか
+同時に実行しない。枠が空くまで最大 LUNCH_HEAVY_QUEUE 件が LUNCH_HEAVY_TIMEOUT 秒まで待ち、
+それを超えたら 503 と Retry-After を返す。
+
+重い処理の枠は「ワーカーのスレッド数（LUNCH_WORKER_CONCURRENCY）−
+注文用の予約枠（LUNCH_RESERVED_CONCURRENCY）」を超えないように切り詰めるので、
+ダウンロードが集中しても注文系のビュー（LUNCH_RESERVED_VIEWS）には常に
+予約枠分のスレッドが残る（待っているリクエストもスレッドを使うので、実行中と
+待ちの合計がこの枠に収まるよう待ち行列も切り詰める）。注文系のビューは待たせることも
+断ることもしない。
+
+ダッシュボードの SSE（LUNCH_STREAM_VIEWS）は接続している間ずっとスレッドを使う
+（WSGI の場合。ASGI でも同時接続数を抑える）ので、同時に LUNCH_STREAM_CONCURRENCY 本までに
+制限し、超えたら待たせずに 503 を返す。枠は応答を閉じた（切断された）ときに返す。
+ストリームの枠も「ワーカーのスレッド数 − 注文用の予約枠」から先に取り、重い処理の枠と
+待ち行列はその残りに収める。
+
+制限はプロセス単位（複数プロセスならそれぞれに同じ枠がある）。
+LUNCH_HEAVY_CONCURRENCY = 0 で無効（MiddlewareNotUsed）。
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+
+
+class HeavyLimiter:
+    """同時実行数 limit、待ち行列 queue のセマフォ。処理時間の移動平均から Retry-After を見積もる"""
+
+    def __init__(self, limit, queue, timeout):
+        self.limit     = limit
+        self.queue     = queue
+        self.timeout   = timeout
+        self._slots    = threading.BoundedSemaphore(limit)
+        self._lock     = threading.Lock()
+        self._waiting  = 0
+        self._avg_time = 1.0   # 重い処理 1 件の平均秒数（指数移動平均）
+
+    def acquire(self) -> bool:
+        if self._slots.acquire(blocking=False):
+            return True
+        with self._lock:
+            if self._waiting >= self.queue:
+                return False
+            self._waiting += 1
+        try:
+            return self._slots.acquire(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def release(self, elapsed):
+        with self._lock:
+            self._avg_time = self._avg_time * 0.8 + elapsed * 0.2
+        self._slots.release()
+
+    def retry_after(self) -> int:
+        """待ち行列がはけるまでのおおよその秒数"""
+        with self._lock:
+            waiting, avg = self._waiting, self._avg_time
+        return max(1, math.ceil(avg * (waiting / self.limit + 1)))
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, get_response):
+        heavy = getattr(settings, 'LUNCH_HEAVY_CONCURRENCY', 2)
+        if not heavy:
+            raise MiddlewareNotUsed
+        workers  = getattr(settings, 'LUNCH_WORKER_CONCURRENCY', 8)
+        reserved = getattr(settings, 'LUNCH_RESERVED_CONCURRENCY', 2)
+        if workers - reserved < 1:
+            raise ImproperlyConfigured(
+                'LUNCH_WORKER_CONCURRENCY は LUNCH_RESERVED_CONCURRENCY より大きくしてください'
+            )
+        self.get_response = get_response
+        self.heavy_views  = set(getattr(settings, 'LUNCH_HEAVY_VIEWS', ()))
+        self.stream_views = set(getattr(settings, 'LUNCH_STREAM_VIEWS', ()))
+        reserved_views = set(getattr(settings, 'LUNCH_RESERVED_VIEWS', ()))
+        overlap = (self.heavy_views | self.stream_views) & reserved_views
+        if overlap:
+            raise ImproperlyConfigured(
+                '注文系のビューは LUNCH_HEAVY_VIEWS / LUNCH_STREAM_VIEWS に入れられません: '
+                f'{", ".join(sorted(overlap))}'
+            )
+        available = workers - reserved
+        streams = 0
+        if self.stream_views:
+            # 重い処理に最低 1 本は残す
+            streams = max(0, min(getattr(settings, 'LUNCH_STREAM_CONCURRENCY', 2), available - 1))
+        self.streams = threading.BoundedSemaphore(streams)
+        limit = min(heavy, available - streams)
+        self.limiter = HeavyLimiter(
+            limit=limit,
+            queue=min(getattr(settings, 'LUNCH_HEAVY_QUEUE', 4), available - streams - limit),
+            timeout=getattr(settings, 'LUNCH_HEAVY_TIMEOUT', 10),
+        )
+
+    def __call__(self, request):
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            started = getattr(request, '_lunch_heavy_started', None)
+            if started is not None:
+                self.limiter.release(time.monotonic() - started)
+            if getattr(request, '_lunch_stream', False):
+                if response is not None and response.streaming:
+                    # ストリームは配信し終えたとき（切断・応答を閉じたときを含む）に枠を返す
+                    if response.is_async:
+                        response.streaming_content = self._release_after_async(response.streaming_content)
+                    else:
+                        content = self._release_after(response.streaming_content)
+                        next(content)
+                        response.streaming_content = content
+                else:
+                    self.streams.release()
+
+    def _release_after(self, content):
+        try:
+            # 呼び出し側で最初の yield まで進めておくので、1 度も読まれずに閉じられても finally を通る
+            yield
+            yield from content
+        finally:
+            self.streams.release()
+
+    async def _release_after_async(self, content):
+        try:
+            async for part in content:
+                yield part
+        finally:
+            self.streams.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is None:
+            return None
+        if match.url_name in self.stream_views:
+            if not self.streams.acquire(blocking=False):
+                return self._busy(retry_after=30)
+            request._lunch_stream = True
+            return None
+        if match.url_name not in self.heavy_views:
+            return None
+        if not self.limiter.acquire():
+            return self._busy(retry_after=self.limiter.retry_after())
+        request._lunch_heavy_started = time.monotonic()
+        return None
+
+    def _busy(self, retry_after):
+        response = HttpResponse(
+            '混み合っています。しばらくしてからもう一度お試しください。',
+            status=503, content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
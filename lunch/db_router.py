@@ -0,0 +1,77 @@
+"""
+レポート・エクスポート用の読み取りレプリカへの振り分け。
+
+Django のルーターはモデル単位でしか接続先を決められないので、
+「どの処理から読むか」はコンテキスト変数で渡す。
+
+    with use_replica():
+        build_monthly_report(y, m)      # この中の SELECT はレプリカへ
+
+use_replica() の外（注文の切り替え、自分の注文の表示など書いた直後に読む処理）と
+すべての書き込みは常に default へ送る。
+
+レプリカは DATABASES['replica']（環境変数 REPLICA_DATABASE_URL、database.py）。
+未設定・LUNCH_USE_REPLICA = False・SQLite のファイルがまだ無い場合は
+default から読む。SQLite 構成では refresh_replica コマンドで default の
+バックアップを定期的に作り、それをレプリカとして使う。
+"""
+import os
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+REPLICA_ALIAS = 'replica'
+
+_reading_replica = ContextVar('lunch_reading_replica', default=False)
+
+
+def replica_alias():
+    """読み取りに使えるレプリカの別名。使えなければ None（default から読む）"""
+    if not getattr(settings, 'LUNCH_USE_REPLICA', True):
+        return None
+    db = settings.DATABASES.get(REPLICA_ALIAS)
+    if db is None:
+        return None
+    if db['ENGINE'] == 'django.db.backends.sqlite3' and not os.path.exists(db['NAME']):
+        return None
+    return REPLICA_ALIAS
+
+
+class use_replica(ContextDecorator):
+    """この中（デコレータならその関数内）の読み取りをレプリカへ送る"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._tokens = []
+
+    def _recreate_cm(self):
+        # デコレータとして使うと同じインスタンスが複数スレッドから呼ばれるので、呼び出しごとに作る
+        return type(self)(self.enabled)
+
+    def __enter__(self):
+        self._tokens.append(_reading_replica.set(self.enabled))
+        return self
+
+    def __exit__(self, *exc):
+        _reading_replica.reset(self._tokens.pop())
+        return False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _reading_replica.get():
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカは default の複製なので、どちらから読んだオブジェクト同士でも関連付けてよい
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # スキーマはレプリケーション（SQLite ならバックアップ）で default から届く
+        return db != REPLICA_ALIAS
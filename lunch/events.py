@@ -0,0 +1,223 @@
+"""
+当日の注文数をリアルタイム配信するための publish/subscribe ハブ。
+
+toggle_order / today_order はコミット後に publish(日付) を呼ぶだけで、
+購読者（SSE で接続中のダッシュボード）がいるワーカーだけが日別注文数を 1 回
+読み込み、その結果を全購読者に配る。購読者が何人いても DB への問い合わせは
+「変更 1 回につきワーカーあたり最大 1 回」（LUNCH_DASHBOARD_MIN_INTERVAL 秒で間引き）。
+通知が届かない変更（別ワーカー、直接の SQL など）も LUNCH_DASHBOARD_SNAPSHOT_TTL 秒で反映される。
+
+ワーカーが複数ある場合は LUNCH_EVENT_BUS_DIR にディレクトリを指定すると、
+購読者のいるワーカーがそこに Unix ドメインソケットを作り、publish した
+ワーカーがディレクトリ内の全ソケットへ通知を送る（同一ホスト内のファンアウト）。
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def today_counts() -> dict:
+    """当日のベンダー別・ライスサイズ別の注文数（日別注文数テーブルへのクエリ 1 回）"""
+    from .models import DailyOrderCounter, Order
+
+    today = date.today()
+    vendors    = {code: 0 for code, _ in Order.VENDORS}
+    rice_sizes = {code: 0 for code, _ in Order.RICE_SIZES}
+    rows = DailyOrderCounter.objects.filter(date=today).values_list('vendor', 'rice_size', 'count')
+    for vendor, rice_size, n in rows:
+        vendors[vendor]       = vendors.get(vendor, 0) + n
+        rice_sizes[rice_size] = rice_sizes.get(rice_size, 0) + n
+    return {
+        'date': today.isoformat(),
+        'vendors': vendors,
+        'rice_sizes': rice_sizes,
+        'total': sum(vendors.values()),
+    }
+
+
+class _SocketBus:
+    """LUNCH_EVENT_BUS_DIR 内の Unix データグラムソケットによるワーカー間通知"""
+
+    def __init__(self, directory, on_message):
+        self.directory  = directory
+        self.on_message = on_message
+        self.path = None
+        self.sock = None
+
+    def listen(self):
+        if self.sock is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{os.getpid()}.sock')
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        threading.Thread(target=self._receive, name='lunch-event-bus', daemon=True).start()
+
+    def _receive(self):
+        while True:
+            data = self.sock.recv(256)
+            self.on_message(data.decode())
+
+    def send(self, message):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        out = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            for name in names:
+                path = os.path.join(self.directory, name)
+                if not name.endswith('.sock') or path == self.path:
+                    continue
+                try:
+                    out.sendto(message.encode(), path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # 終了したワーカーのソケットが残っている
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except OSError:
+                    pass
+        finally:
+            out.close()
+
+
+class OrderEventHub:
+    def __init__(self):
+        self._lock        = threading.Lock()
+        self._subscribers = set()          # {(event loop, asyncio.Queue)}
+        self._dirty       = threading.Event()
+        self._snapshot    = None
+        self._snapshot_at = 0.0
+        self._refresher   = None
+        self._bus         = None
+
+    # ── publish 側（同期ビューから呼ばれる） ──
+
+    def publish_after_commit(self, start: date, end: date = None):
+        """start〜end の注文を書き換えたトランザクションのコミット後に、当日が含まれていれば通知する"""
+        today = date.today()
+        if start <= today <= (end or start):
+            transaction.on_commit(lambda: self.publish(today))
+
+    def publish(self, order_date: date):
+        """order_date の注文が変わったことを通知する。コミット後に呼ぶこと"""
+        message = order_date.isoformat()
+        self._on_message(message)
+        bus = self._get_bus()
+        if bus is not None:
+            bus.send(message)
+
+    def _on_message(self, message):
+        if message != date.today().isoformat():
+            return
+        with self._lock:
+            self._snapshot = None
+            if not self._subscribers:
+                return
+        self._dirty.set()
+
+    def _get_bus(self):
+        directory = getattr(settings, 'LUNCH_EVENT_BUS_DIR', None)
+        if directory and self._bus is None:
+            with self._lock:
+                if self._bus is None:
+                    self._bus = _SocketBus(directory, self._on_message)
+        return self._bus
+
+    # ── 集計と配信（ワーカーごとに 1 スレッド） ──
+
+    def _run_refresher(self):
+        try:
+            self._refresh_loop()
+        finally:
+            # 想定外の理由でスレッドが終わっても、次の subscribe で起動し直せるようにする
+            with self._lock:
+                if self._refresher is threading.current_thread():
+                    self._refresher = None
+
+    def _refresh_loop(self):
+        interval = getattr(settings, 'LUNCH_DASHBOARD_MIN_INTERVAL', 0.5)
+        ttl      = getattr(settings, 'LUNCH_DASHBOARD_SNAPSHOT_TTL', 5)
+        while True:
+            # 通知が来なくても（他のワーカー・通知しない書き込み経路の変更）ttl ごとに集計し直す
+            notified = self._dirty.wait(ttl)
+            if notified:
+                time.sleep(interval)   # 連続した変更をまとめて 1 回の集計にする
+            self._dirty.clear()
+            with self._lock:
+                if not self._subscribers:
+                    continue
+            try:
+                snapshot = today_counts()
+            except Exception:
+                # DB の一時的な障害でスレッドを止めない（次の通知か ttl 後にやり直す）
+                logger.exception('当日の注文数を集計できませんでした')
+                continue
+            finally:
+                close_old_connections()
+            with self._lock:
+                changed = snapshot != self._snapshot
+                self._snapshot    = snapshot
+                self._snapshot_at = time.monotonic()
+                subscribers = list(self._subscribers)
+            if not changed:
+                continue
+            for loop, queue in subscribers:
+                loop.call_soon_threadsafe(_offer_latest, queue, snapshot)
+
+    def current(self) -> dict:
+        """最新の集計結果（キャッシュが無いか LUNCH_DASHBOARD_SNAPSHOT_TTL 秒より古ければ集計する）"""
+        ttl = getattr(settings, 'LUNCH_DASHBOARD_SNAPSHOT_TTL', 5)
+        with self._lock:
+            snapshot, taken_at = self._snapshot, self._snapshot_at
+        if (snapshot is None or snapshot['date'] != date.today().isoformat()
+                or time.monotonic() - taken_at >= ttl):
+            snapshot = today_counts()
+            with self._lock:
+                self._snapshot    = snapshot
+                self._snapshot_at = time.monotonic()
+        return snapshot
+
+    # ── subscribe 側（ASGI の SSE ビューから使う） ──
+
+    def subscribe(self):
+        loop  = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.add((loop, queue))
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self._run_refresher, name='lunch-dashboard', daemon=True
+                )
+                self._refresher.start()
+        bus = self._get_bus()
+        if bus is not None:
+            bus.listen()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {s for s in self._subscribers if s[1] is not queue}
+
+
+def _offer_latest(queue, snapshot):
+    # 読み切れていない古い集計は捨て、常に最新だけを渡す
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(snapshot)
+
+
+order_events = OrderEventHub()
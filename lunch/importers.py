@@ -0,0 +1,181 @@
+"""
+注文の CSV 一括取り込み。
+
+CSV の 1 行 = 1 注文（ユーザーコード, 日付, ベンダー, ライス, 数量）。
+ファイルは 1 行ずつ読み、batch_size 行ごとに新しい注文は bulk_create、
+既存の注文の書き換えは bulk_update でまとめて書き込むので、巨大なファイルでも
+メモリに全行を載せない。
+
+注文は画面・定期注文と同じく 1 ユーザー 1 日 1 件。既に同じ (ユーザー, 日付) の注文が
+あれば、その行を CSV の内容（ベンダー・ライス）で書き換え、キャンセル済みなら注文状態に
+戻して version を進める（開いている画面からの切り替えは 409 になる）。
+発注済の注文は変更せずエラーとして返す。同じ (ユーザー, 日付) の行が複数あれば後の行を使う。
+
+日別注文数・FAX・月次レポート・請求書照合はすべて 1 注文 = 1 食で数えるので、
+数量列は省略するか 1 にする（それ以外はエラー）。
+
+ユーザーコードは月次レポートの「コード」（ユーザー ID）またはユーザー名。
+"""
+import csv
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import audit
+from .events import order_events
+from .models import DailyOrderCounter, MonthlyDataVersion, Order
+
+
+HEADER_WORDS = {'code', 'user', 'コード', 'ユーザー', '社員コード'}
+
+
+@dataclass
+class ImportResult:
+    written: int = 0
+    errors: list = field(default_factory=list)   # [(行番号, 元の行, エラー内容)]
+    first_date: date = None
+    last_date: date = None
+
+
+def _lookup(choices):
+    """コードと表示名のどちらでも引ける辞書（'veg17' / 'ベジタブルディッシュ17' → 'veg17'）"""
+    table = {}
+    for code, label in choices:
+        table[code] = code
+        table[label] = code
+    return table
+
+
+def import_orders_csv(lines, batch_size=1000) -> ImportResult:
+    """
+    lines（テキストの行を返すイテラブル。開いたファイルでよい）から注文を取り込む。
+    """
+    User = get_user_model()
+    # ユーザーは最初に 1 回だけまとめて読み込む（行ごとの問い合わせはしない）
+    users = {}
+    for pk, username in User.objects.values_list('pk', 'username'):
+        users[str(pk)] = pk
+        users[username] = pk
+    vendors    = _lookup(Order.VENDORS)
+    rice_sizes = _lookup(Order.RICE_SIZES)
+
+    result = ImportResult()
+    batch  = {}      # (ユーザー, 日付) → (行番号, 元の行, Order)。同じキーは後の行で上書き
+    months = set()   # 取り込んだ月（その月の 1 日）
+
+    def flush():
+        orders = [o for _, _, o in batch.values()]
+        # 1 ユーザー 1 日 1 注文（toggle_order・定期注文と同じ）。同じ (ユーザー, 日付) の既存注文を
+        # バッチごとに 1 回で取得する。万一複数あれば有効な（キャンセルされていない）行を使う
+        existing = {}
+        for o in (
+            Order.objects.filter(
+                user_id__in={o.user_id for o in orders},
+                order_date__range=(min(o.order_date for o in orders),
+                                   max(o.order_date for o in orders)),
+            )
+            .only('pk', 'user_id', 'order_date', 'vendor', 'rice_size', 'status', 'canceled', 'version')
+            .order_by('canceled', 'id')
+        ):
+            existing.setdefault((o.user_id, o.order_date), o)
+
+        inserts, updates = [], []
+        now = timezone.now()
+        for key, (lineno, row, o) in batch.items():
+            current = existing.get(key)
+            if current is None:
+                inserts.append(o)
+                continue
+            if not current.canceled and (current.vendor, current.rice_size) == (o.vendor, o.rice_size):
+                continue   # 既に同じ注文がある
+            if current.status == 'sent':
+                result.errors.append((lineno, row, '発注済の注文は変更できません'))
+                continue
+            # 既存の行をこの行の内容に書き換える（別ベンダー・ライスの 2 件目は作らない）
+            o.pk, o.version, o.updated_at = current.pk, current.version, now
+            updates.append((o, audit.state_of(current)))
+
+        with transaction.atomic():
+            # 読み込んだ後に同じキーで作られていたらその行を上書きする（pk も返る）
+            Order.objects.bulk_create(
+                inserts,
+                update_conflicts=True,
+                unique_fields=['user', 'order_date', 'vendor', 'rice_size'],
+                update_fields=['quantity', 'canceled', 'canceled_at', 'updated_at'],
+            )
+            Order.objects.bulk_update(
+                [o for o, _ in updates],
+                ['vendor', 'rice_size', 'quantity', 'canceled', 'canceled_at', 'updated_at'],
+            )
+            # 開いている画面からの切り替えが 409 になるよう、書き換えた行の version を進める
+            Order.objects.filter(pk__in=[o.pk for o, _ in updates]).update(version=F('version') + 1)
+            for o in inserts:
+                audit.record(o, 'none', 'ordered', 'import')
+            for o, old_state in updates:
+                if old_state != 'ordered':
+                    audit.record(o, old_state, 'ordered', 'import')
+        result.written += len(inserts) + len(updates)
+        batch.clear()
+
+    for lineno, row in enumerate(csv.reader(lines), start=1):
+        if not row or not any(c.strip() for c in row):
+            continue
+        if lineno == 1 and row[0].strip().lower() in HEADER_WORDS:
+            continue
+        try:
+            if len(row) < 4:
+                raise ValueError('列が足りません（ユーザーコード, 日付, ベンダー, ライス, 数量）')
+            code, day, vendor, rice = (c.strip() for c in row[:4])
+            quantity = row[4].strip() if len(row) > 4 and row[4].strip() else '1'
+
+            if code not in users:
+                raise ValueError(f'ユーザーが見つかりません: {code}')
+            try:
+                day = date.fromisoformat(day.replace('/', '-'))
+            except ValueError:
+                raise ValueError(f'日付の形式が不正です: {day}')
+            if vendor not in vendors:
+                raise ValueError(f'ベンダーが不正です: {vendor}')
+            if rice not in rice_sizes:
+                raise ValueError(f'ライスサイズが不正です: {rice}')
+            if not quantity.isdigit() or int(quantity) < 1:
+                raise ValueError(f'数量が不正です: {quantity}')
+            if int(quantity) != 1:
+                raise ValueError(f'数量は 1 のみ取り込めます（1 注文 = 1 食）: {quantity}')
+        except ValueError as e:
+            result.errors.append((lineno, row, str(e)))
+            continue
+
+        order = Order(
+            user_id=users[code],
+            order_date=day,
+            vendor=vendors[vendor],
+            rice_size=rice_sizes[rice],
+            quantity=1,
+            canceled=False,
+            canceled_at=None,
+        )
+        key = (order.user_id, order.order_date)
+        batch.pop(key, None)   # 後の行を最後に書く（順序も後ろへ）
+        batch[key] = (lineno, row, order)
+        months.add(day.replace(day=1))
+        if result.first_date is None or day < result.first_date:
+            result.first_date = day
+        if result.last_date is None or day > result.last_date:
+            result.last_date = day
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    # bulk_create は注文切り替えの経路を通らないので日別注文数は作り直し、
+    # 月次レポートのキャッシュも無効にする
+    if result.first_date:
+        DailyOrderCounter.rebuild(result.first_date, result.last_date)
+        MonthlyDataVersion.bump(*months)
+        order_events.publish_after_commit(result.first_date, result.last_date)
+    return result
@@ -0,0 +1,152 @@
+"""
+レポート・FAX 生成ジョブのキュー（DB の ReportJob テーブルを使用）。
+
+Web ワーカーは enqueue() で登録してすぐ応答を返し、重い生成処理は
+run_lunch_worker コマンドのプロセスが行う。ワーカーは複数起動してよく、
+待機中ジョブの取得は status='queued' を条件にした UPDATE 1 文で行うため、
+同じジョブを 2 つのワーカーが処理することはない。
+
+実行中のジョブは進捗を書くたびに heartbeat_at を更新する。LUNCH_JOB_LEASE 秒
+更新の無い実行中のジョブはワーカーが落ちたものとして待機中に戻し、別のワーカーが
+やり直す（LUNCH_JOB_MAX_ATTEMPTS 回目でも終わらなければ失敗にする）。
+終わったジョブは LUNCH_JOB_RETENTION_DAYS 日後に出力ファイルごと削除する（prune）。
+"""
+import os
+import socket
+import traceback
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .business_calendar import is_supported_year
+from .models import Order, ReportJob
+from .report_cache import get_monthly_report
+from .reports import (
+    build_fax_excel, build_fax_pdf,
+    fax_filename, monthly_report_filename,
+)
+
+
+def validate_params(kind: str, params: dict) -> dict:
+    """ワーカーで失敗する前に params を検査し、正規化したものを返す（不正なら ValueError）"""
+    if kind == 'monthly_report':
+        try:
+            year, month = int(params['year']), int(params['month'])
+        except (KeyError, TypeError):
+            raise ValueError('year and month are required')
+        if not is_supported_year(year):
+            raise ValueError(f'year out of range: {year}')
+        if not 1 <= month <= 12:
+            raise ValueError(f'month out of range: {month}')
+        return {'year': year, 'month': month}
+    if kind in ('fax_pdf', 'fax_excel'):
+        day    = date.fromisoformat(params.get('date') or '')
+        vendor = params.get('vendor', 'veg17')
+        if vendor not in dict(Order.VENDORS):
+            raise ValueError(f'unknown vendor: {vendor}')
+        return {'date': day.isoformat(), 'vendor': vendor}
+    raise ValueError(f'unknown job kind: {kind}')
+
+
+def enqueue(kind: str, params: dict, user=None) -> ReportJob:
+    params = validate_params(kind, params)
+    return ReportJob.objects.create(kind=kind, params=params, created_by=user)
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def reclaim_stale() -> int:
+    """応答の途絶えた実行中のジョブを待機中に戻す（試行回数を使い切ったものは失敗に）。戻した件数を返す"""
+    lease  = getattr(settings, 'LUNCH_JOB_LEASE', 600)
+    now    = timezone.now()
+    cutoff = now - timedelta(seconds=lease)
+    # heartbeat_at の無い行（heartbeat 導入前に確保されたもの）は開始日時で判断する
+    stale = ReportJob.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    stale.filter(attempts__gte=getattr(settings, 'LUNCH_JOB_MAX_ATTEMPTS', 3)).update(
+        status='failed', finished_at=now,
+        error='ワーカーの応答が無いまま実行回数の上限に達しました',
+    )
+    return stale.update(status='queued', worker='')
+
+
+def claim_next(worker: str):
+    """待機中のジョブを古い順に 1 件確保して返す（無ければ None）"""
+    reclaim_stale()
+    while True:
+        job_id = (
+            ReportJob.objects.filter(status='queued').order_by('id')
+            .values_list('id', flat=True).first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+            status='running', worker=worker, started_at=now, heartbeat_at=now, progress=0,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return ReportJob.objects.get(id=job_id)
+        # 他のワーカーに先を越された → 次の候補へ
+
+
+def _build(job, progress):
+    p = job.params
+    if job.kind == 'monthly_report':
+        y, m = int(p['year']), int(p['month'])
+        return monthly_report_filename(y, m), get_monthly_report(y, m, progress=progress)
+    day = date.fromisoformat(p['date'])
+    vendor = p.get('vendor', 'veg17')
+    if job.kind == 'fax_pdf':
+        return fax_filename(day, 'pdf'), build_fax_pdf(day, vendor)
+    return fax_filename(day, 'xlsx'), build_fax_excel(day, vendor)
+
+
+def run_job(job: ReportJob) -> ReportJob:
+    """確保済みのジョブを実行し、出力ファイルと状態を保存する"""
+    last = [0]
+
+    def progress(fraction):
+        # 1% 以上進んだときだけ書き込む（heartbeat も兼ねる）
+        percent = min(99, int(fraction * 100))
+        if percent > last[0]:
+            last[0] = percent
+            ReportJob.objects.filter(pk=job.pk).update(progress=percent, heartbeat_at=timezone.now())
+
+    try:
+        filename, content = _build(job, progress)
+    except Exception:
+        job.status = 'failed'
+        job.error  = traceback.format_exc()
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.output.save(filename, ContentFile(content), save=False)
+    job.filename = filename
+    job.status   = 'done'
+    job.progress = 100
+    job.finished_at = timezone.now()
+    job.save(update_fields=['output', 'filename', 'status', 'progress', 'finished_at'])
+    return job
+
+
+def prune(days=None) -> int:
+    """終わってから days 日（既定 LUNCH_JOB_RETENTION_DAYS）過ぎたジョブを出力ファイルごと削除し、件数を返す"""
+    days = days if days is not None else getattr(settings, 'LUNCH_JOB_RETENTION_DAYS', 7)
+    old = ReportJob.objects.filter(
+        status__in=('done', 'failed'), finished_at__lt=timezone.now() - timedelta(days=days),
+    )
+    count = 0
+    for job in old.iterator():
+        if job.output:
+            job.output.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -0,0 +1,107 @@
+import csv
+import json
+import sys
+from datetime import date, datetime, time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from lunch.audit import to_json
+from lunch.db_router import use_replica
+from lunch.models import OrderAuditLog
+
+
+FIELDS = ['created_at', 'actor_id', 'actor', 'order_id', 'order_user_id', 'order_date',
+          'vendor', 'rice_size', 'old_state', 'new_state', 'source']
+
+
+class Command(BaseCommand):
+    help = "注文の変更履歴を検索・出力します（LUNCH_AUDIT_BACKEND に応じて DB または JSONL から読む）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default=None, help='注文者のユーザー名')
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='注文日 YYYY-MM-DD')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, default=None,
+                            help='操作日の開始 YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, default=None,
+                            help='操作日の終了 YYYY-MM-DD')
+        parser.add_argument('--source', default=None,
+                            help='操作元（toggle_order, today_order, admin, import, standing_order）')
+        parser.add_argument('--format', choices=['text', 'csv', 'jsonl'], default='text')
+        parser.add_argument('--output', default=None, help='出力ファイル（省略時は標準出力）')
+
+    @use_replica()
+    def handle(self, *args, **options):
+        filters = {}
+        if options['user']:
+            try:
+                filters['order_user_id'] = get_user_model().objects.get(username=options['user']).pk
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'ユーザーが見つかりません: {options["user"]}')
+        if options['date']:
+            filters['order_date'] = options['date']
+        if options['source']:
+            filters['source'] = options['source']
+        tz = timezone.get_current_timezone()
+        since = datetime.combine(options['start'], time.min, tz) if options['start'] else None
+        until = datetime.combine(options['end'], time.max, tz) if options['end'] else None
+
+        if getattr(settings, 'LUNCH_AUDIT_BACKEND', 'db') == 'jsonl':
+            entries = self._from_jsonl(filters, since, until)
+        else:
+            entries = self._from_db(filters, since, until)
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            count = self._write(entries, options['format'], out)
+        finally:
+            if options['output']:
+                out.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f'{count} 件を {options["output"]} に出力しました'))
+
+    def _from_db(self, filters, since, until):
+        qs = OrderAuditLog.objects.filter(**filters).order_by('created_at', 'id')
+        if since:
+            qs = qs.filter(created_at__gte=since)
+        if until:
+            qs = qs.filter(created_at__lte=until)
+        return qs.values(*FIELDS).iterator(chunk_size=2000)
+
+    def _from_jsonl(self, filters, since, until):
+        # ファイルは時刻順に追記されるので、1 行ずつ読みながら絞り込む
+        wanted = {k: v.isoformat() if hasattr(v, 'isoformat') else v for k, v in filters.items()}
+        try:
+            f = open(settings.LUNCH_AUDIT_FILE, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                entry = json.loads(line)
+                if any(entry.get(k) != v for k, v in wanted.items()):
+                    continue
+                created_at = datetime.fromisoformat(entry['created_at'])
+                if (since and created_at < since) or (until and created_at > until):
+                    continue
+                entry['created_at'] = created_at
+                yield entry
+
+    def _write(self, entries, fmt, out):
+        count = 0
+        if fmt == 'csv':
+            w = csv.DictWriter(out, fieldnames=FIELDS)
+            w.writeheader()
+        for e in entries:
+            if fmt == 'csv':
+                w.writerow(e)
+            elif fmt == 'jsonl':
+                out.write(to_json(e) + '\n')
+            else:
+                out.write(
+                    f'{timezone.localtime(e["created_at"]):%Y-%m-%d %H:%M:%S} '
+                    f'{e["actor"] or "-":<12} user={e["order_user_id"]} {e["order_date"]} '
+                    f'{e["vendor"]}/{e["rice_size"]} {e["old_state"]}→{e["new_state"]} ({e["source"]})\n'
+                )
+            count += 1
+        return count
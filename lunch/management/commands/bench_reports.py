@@ -0,0 +1,136 @@
+import contextlib
+import io
+import statistics
+import tempfile
+import time
+from datetime import date
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+
+class QueryCounter:
+    """execute_wrapper で発行クエリ数を数える（DEBUG のクエリログ上限に影響されない）"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+TARGETS = ['download_monthly_report', 'report_lunch_summary', 'fax_order_pdf', 'fax_order_excel',
+           'monthly_calendar']
+
+
+class Command(BaseCommand):
+    help = "レポート／FAX 出力の処理時間とクエリ数を計測して比較表を表示します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year',   type=int, default=date.today().year)
+        parser.add_argument('--month',  type=int, default=date.today().month)
+        parser.add_argument('--repeat', type=int, default=3, help='各対象の実行回数')
+        parser.add_argument('--only', nargs='*', choices=TARGETS, default=TARGETS,
+                            help='計測対象を絞り込む')
+        parser.add_argument('--users',  type=int, default=200,
+                            help='使い捨てのデータベースに作成するユーザー数')
+        parser.add_argument('--months', type=int, default=3,
+                            help='使い捨てのデータベースに作成する注文の月数')
+        parser.add_argument('--current-db', action='store_true',
+                            help='使い捨てのデータベースを作らず、設定中のデータベースで計測する')
+
+    def handle(self, *args, **options):
+        if options['current_db']:
+            return self.bench(options)
+        # 既定では使い捨てのデータベース（テスト用 DB と同じ作り方）に seed_lunch_data で
+        # データを作って計測し、終わったら捨てる。本番・開発のデータには触れない
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir, \
+                    override_settings(LUNCH_USE_REPLICA=False, LUNCH_REPORT_CACHE_DIR=cache_dir):
+                call_command('seed_lunch_data', users=options['users'], months=options['months'],
+                             seed=0, stdout=io.StringIO())
+                get_user_model().objects.create_user('bench-staff', is_staff=True)
+                self.bench(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def bench(self, options):
+        from lunch import views
+        from lunch.report_cache import get_report_cache
+
+        User = get_user_model()
+        staff = User.objects.filter(is_staff=True, is_active=True).order_by('id').first()
+        if staff is None:
+            raise CommandError('計測には有効な staff ユーザーが 1 人以上必要です')
+
+        year, month = options['year'], options['month']
+        factory = RequestFactory()
+
+        def view_runner(view, path, *args, **params):
+            def run():
+                request = factory.get(path, params)
+                request.user = staff
+                response = view(request, *args)
+                return len(response.content)
+            return run
+
+        def command_runner():
+            # report_lunch_summary はカレントディレクトリに出力するので一時ディレクトリで実行
+            with tempfile.TemporaryDirectory() as tmp, contextlib.chdir(tmp):
+                call_command('report_lunch_summary', year=year, month=month, stdout=io.StringIO())
+                with open(f'lunch_report_{year}{month:02}.xlsx', 'rb') as f:
+                    return len(f.read())
+
+        runners = {
+            'download_monthly_report': view_runner(
+                views.download_monthly_report, '/report/', year=year, month=month),
+            'report_lunch_summary': command_runner,
+            'fax_order_pdf':   view_runner(views.fax_order_pdf, '/fax-order/'),
+            'fax_order_excel': view_runner(views.fax_order_excel, '/excel-order/'),
+            'monthly_calendar': view_runner(
+                views.monthly_calendar, f'/calendar/{year}/{month}/', year, month),
+        }
+        # 計測のたびに（計測時間の外で）行う準備。月次レポートはディスクキャッシュを
+        # 空にして、キャッシュヒットではなく生成の時間を測る
+        setups = {
+            'download_monthly_report': lambda: get_report_cache().clear(),
+        }
+
+        self.stdout.write(
+            f'対象: {year}年{month}月 / ユーザー {User.objects.count()} 人 / '
+            f'実行回数 {options["repeat"]}'
+        )
+        rows = []
+        for name in options['only']:
+            timings, queries, size, error = [], 0, 0, ''
+            for _ in range(options['repeat']):
+                try:
+                    if name in setups:
+                        setups[name]()
+                    counter = QueryCounter()
+                    with connection.execute_wrapper(counter):
+                        start = time.perf_counter()
+                        size = runners[name]()
+                        timings.append(time.perf_counter() - start)
+                    queries = counter.count
+                except Exception as e:
+                    error = f'{type(e).__name__}: {e}'
+                    break
+            rows.append((name, timings, queries, size, error))
+
+        header = f'{"対象":<26}{"min(ms)":>10}{"mean(ms)":>10}{"max(ms)":>10}{"queries":>9}{"bytes":>10}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, timings, queries, size, error in rows:
+            if error:
+                self.stdout.write(self.style.ERROR(f'{name:<26}失敗 ({error})'))
+                continue
+            ms = [t * 1000 for t in timings]
+            self.stdout.write(
+                f'{name:<26}{min(ms):>10.1f}{statistics.mean(ms):>10.1f}{max(ms):>10.1f}'
+                f'{queries:>9}{size:>10}'
+            )
@@ -0,0 +1,89 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# ワーカー起動時と同じ読み込み（WSGI アプリケーション + URLconf = 全ビュー）を行い、
+# 最大 RSS と、レンダリング系の重いモジュールが読み込まれたかを JSON で返す
+PROBE = """
+import json, resource, sys
+from NSE_lunch_order.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+heavy = sorted({m.split('.')[0] for m in sys.modules} & {HEAVY})
+print(json.dumps({"rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "heavy": heavy}))
+"""
+HEAVY_MODULES = ['weasyprint', 'openpyxl', 'fontTools', 'pydyf', 'tinycss2', 'cssselect2', 'et_xmlfile']
+# -X importtime の出力: "import time:  self [us] | cumulative | imported package"
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)')
+
+
+class Command(BaseCommand):
+    help = "ワーカー起動時の import 時間（python -X importtime）と RSS を計測し、予算を超えたら失敗します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='計測回数（中央値を使う）')
+        parser.add_argument('--top', type=int, default=15, help='表示する重いモジュールの数')
+        parser.add_argument('--max-import-ms', type=float,
+                            default=getattr(settings, 'LUNCH_STARTUP_IMPORT_BUDGET_MS', None),
+                            help='import 時間の予算（ミリ秒、既定は LUNCH_STARTUP_IMPORT_BUDGET_MS）')
+        parser.add_argument('--max-rss-mb', type=float,
+                            default=getattr(settings, 'LUNCH_STARTUP_RSS_BUDGET_MB', None),
+                            help='起動直後の最大 RSS の予算（MB、既定は LUNCH_STARTUP_RSS_BUDGET_MB）')
+        parser.add_argument('--allow-heavy', action='store_true',
+                            help='起動時に WeasyPrint / openpyxl が読み込まれても失敗にしない')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'NSE_lunch_order.settings')}
+        code = PROBE.replace('{HEAVY}', repr(set(HEAVY_MODULES)))
+
+        runs = []
+        for _ in range(max(1, options['repeat'])):
+            # 計測ごとに新しいプロセスで（.pyc は作成済みの状態で）測る
+            proc = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f'計測用プロセスが失敗しました:\n{proc.stderr[-2000:]}')
+            runs.append((self._parse_importtime(proc.stderr), json.loads(proc.stdout.splitlines()[-1])))
+
+        totals = [sum(top for top in modules.values()) / 1000 for modules, _ in runs]
+        rss_mb = [probe['rss_kb'] / 1024 for _, probe in runs]
+        import_ms = statistics.median(totals)
+        rss = statistics.median(rss_mb)
+        modules, probe = runs[-1]
+
+        self.stdout.write(f'import 時間（中央値）: {import_ms:.0f} ms   最大 RSS（中央値）: {rss:.1f} MB')
+        self.stdout.write(f'起動時に読み込まれた重いモジュール: {", ".join(probe["heavy"]) or "なし"}')
+        self.stdout.write(f'\nimport 時間の大きいパッケージ（上位 {options["top"]}）')
+        for name, us in sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:options['top']]:
+            self.stdout.write(f'  {us / 1000:8.1f} ms  {name}')
+
+        failures = []
+        if options['max_import_ms'] is not None and import_ms > options['max_import_ms']:
+            failures.append(f'import 時間 {import_ms:.0f} ms > 予算 {options["max_import_ms"]:.0f} ms')
+        if options['max_rss_mb'] is not None and rss > options['max_rss_mb']:
+            failures.append(f'RSS {rss:.1f} MB > 予算 {options["max_rss_mb"]:.1f} MB')
+        if probe['heavy'] and not options['allow_heavy']:
+            failures.append(f'起動時に {", ".join(probe["heavy"])} が読み込まれています')
+        if failures:
+            raise CommandError(' / '.join(failures))
+        self.stdout.write(self.style.SUCCESS('予算内です'))
+
+    @staticmethod
+    def _parse_importtime(stderr) -> dict:
+        """パッケージ（モジュール名の先頭）ごとの import 時間 [us]（self 時間の合計）"""
+        packages = {}
+        for line in stderr.splitlines():
+            m = IMPORTTIME_RE.match(line)
+            if m:
+                package = m.group(2).split('.')[0]
+                packages[package] = packages.get(package, 0) + int(m.group(1))
+        return packages
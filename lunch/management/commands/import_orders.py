@@ -0,0 +1,44 @@
+import csv
+import time
+from django.core.management.base import BaseCommand, CommandError
+from lunch.importers import import_orders_csv
+
+
+class Command(BaseCommand):
+    help = "注文を CSV（ユーザーコード, 日付, ベンダー, ライス, 数量）から一括で取り込みます"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='取り込む CSV ファイル')
+        parser.add_argument('--batch-size', type=int, default=1000, help='一度に書き込む行数')
+        parser.add_argument('--encoding', default='utf-8-sig',
+                            help='文字コード（Excel で保存した CSV は cp932）')
+        parser.add_argument('--errors', default=None,
+                            help='エラー行を書き出す CSV ファイル（省略時は画面に表示）')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size には 1 以上を指定してください')
+        start = time.perf_counter()
+        try:
+            with open(options['path'], newline='', encoding=options['encoding']) as f:
+                result = import_orders_csv(f, batch_size=options['batch_size'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'ファイルを読み込めません: {e}')
+        elapsed = time.perf_counter() - start
+
+        if result.errors:
+            if options['errors']:
+                with open(options['errors'], 'w', newline='', encoding='utf-8-sig') as out:
+                    w = csv.writer(out)
+                    w.writerow(['行', 'エラー', '内容'])
+                    for lineno, row, message in result.errors:
+                        w.writerow([lineno, message, *row])
+                self.stdout.write(self.style.WARNING(
+                    f'エラー {len(result.errors)} 行を {options["errors"]} に書き出しました'
+                ))
+            else:
+                for lineno, row, message in result.errors:
+                    self.stdout.write(self.style.WARNING(f'{lineno} 行目: {message}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.written} 件を取り込みました（エラー {len(result.errors)} 行, {elapsed:.1f} 秒）'
+        ))
@@ -0,0 +1,37 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from lunch.business_calendar import get_business_calendar
+from lunch.standing_orders import materialize_standing_orders
+
+
+class Command(BaseCommand):
+    help = "定期注文から、注文変更可能期間の注文を一括で作成します（毎日 cron で実行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, default=None,
+                            help='期間の開始日 YYYY-MM-DD（省略時は今日）')
+        parser.add_argument('--days', type=int, default=6,
+                            help='作成する営業日数（既定はカレンダーで変更できる 6 営業日）')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='作成する件数だけ表示して書き込まない')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days には 1 以上を指定してください')
+        # toggle_order と同じ「start から N 営業日」を対象にする。ただし当日分は
+        # 締め切りを過ぎている可能性があるので、--start 省略時は今日を除く
+        today = date.today()
+        start = options['start'] or today
+        days  = get_business_calendar().next_open_days(start, options['days'])
+        if options['start'] is None:
+            days = [d for d in days if d > today]
+
+        result = materialize_standing_orders(days, dry_run=options['dry_run'])
+        if not result.days:
+            self.stdout.write('対象となる営業日がありません')
+            return
+        prefix = '（dry-run）' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}{result.days[0]:%Y-%m-%d}〜{result.days[-1]:%Y-%m-%d}: '
+            f'{result.created} 件作成、既存の注文・キャンセルにより {result.skipped} 件スキップ'
+        ))
@@ -0,0 +1,115 @@
+import calendar
+import csv
+import sys
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lunch.models import Order
+from lunch.pricing import PriceTable
+from lunch.reconciliation import iter_csv_rows, iter_xlsx_rows, reconcile_invoice
+
+
+class Command(BaseCommand):
+    help = "ベンダーの請求書（CSV / XLSX: 日付, ライス, 食数, 金額）を注文と突き合わせ、差異を出力します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path',
+                            help='請求書ファイル（複数指定可。.xlsx 以外は CSV として読む）')
+        parser.add_argument('--vendor', required=True, choices=[c for c, _ in Order.VENDORS],
+                            help='請求元のベンダー')
+        parser.add_argument('--year', type=int, help='照合する年（--month 省略時は 1 年分）')
+        parser.add_argument('--month', type=int, help='照合する月')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help='照合期間の開始日（YYYY-MM-DD）')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help='照合期間の終了日（YYYY-MM-DD）')
+        parser.add_argument('--encoding', default='utf-8-sig',
+                            help='CSV の文字コード（Excel で保存した CSV は cp932）')
+        parser.add_argument('--format', choices=['text', 'csv'], default='text')
+        parser.add_argument('--output', help='出力先ファイル（省略時は画面）')
+
+    def _period(self, options):
+        if options['year']:
+            if options['start'] or options['end']:
+                raise CommandError('--year/--month と --from/--to は同時に指定できません')
+            y, m = options['year'], options['month']
+            if m is None:
+                return date(y, 1, 1), date(y, 12, 31)
+            if not 1 <= m <= 12:
+                raise CommandError('--month には 1〜12 を指定してください')
+            return date(y, m, 1), date(y, m, calendar.monthrange(y, m)[1])
+        if options['month']:
+            raise CommandError('--month には --year も指定してください')
+        if not (options['start'] and options['end']):
+            raise CommandError('--year [--month] か --from/--to で照合期間を指定してください')
+        if options['start'] > options['end']:
+            raise CommandError('--from は --to 以前の日付にしてください')
+        return options['start'], options['end']
+
+    def _rows(self, paths, encoding):
+        # 複数ファイル（月ごとの請求書など）を 1 本の行ストリームとしてつなぐ
+        for path in paths:
+            if path.lower().endswith('.xlsx'):
+                yield from iter_xlsx_rows(path)
+            else:
+                with open(path, newline='', encoding=encoding) as f:
+                    yield from iter_csv_rows(f)
+
+    def handle(self, *args, **options):
+        start_date, end_date = self._period(options)
+        started = time.perf_counter()
+        try:
+            result = reconcile_invoice(
+                self._rows(options['paths'], options['encoding']),
+                options['vendor'], start_date, end_date, PriceTable.load(),
+            )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f'ファイルを読み込めません: {e}')
+        elapsed = time.perf_counter() - started
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8-sig') \
+            if options['output'] else sys.stdout
+        try:
+            if options['format'] == 'csv':
+                self._write_csv(out, result)
+            else:
+                self._write_text(out, result)
+        finally:
+            if options['output']:
+                out.close()
+
+        summary = (
+            f'{result.vendor} {result.start}〜{result.end}: 請求 {result.invoice_rows} 行, '
+            f'一致 {result.matched}, 差異 {len(result.discrepancies)}, '
+            f'エラー {len(result.errors)} 行（{elapsed:.2f} 秒）'
+        )
+        style = self.style.SUCCESS if result.ok else self.style.WARNING
+        self.stderr.write(style(summary))
+
+    def _write_csv(self, out, result):
+        w = csv.writer(out)
+        w.writerow(['日付', 'ライス', '種類', '注文食数', '請求食数', '食数差',
+                    '注文金額', '請求金額', '金額差'])
+        for d in result.discrepancies:
+            w.writerow([d.day.isoformat(), d.rice_size, d.kind_label,
+                        d.ordered_count, d.invoiced_count, d.count_diff,
+                        d.expected_amount, d.invoiced_amount, d.amount_diff])
+        for lineno, row, message in result.errors:
+            w.writerow(['', '', f'{lineno} 行目: {message}', *row])
+
+    def _write_text(self, out, result):
+        for d in result.discrepancies:
+            out.write(
+                f'{d.day} {d.rice_size} {d.kind_label}: 食数 {d.ordered_count} → {d.invoiced_count}'
+                f'（{d.count_diff:+}）, 金額 {d.expected_amount:,} → {d.invoiced_amount:,}'
+                f'（{d.amount_diff:+,}）\n'
+            )
+        for lineno, row, message in result.errors:
+            out.write(f'{lineno} 行目: {message}\n')
+        out.write(
+            f'合計: 食数 {result.ordered_count} → {result.invoiced_count}, '
+            f'金額 {result.expected_amount:,} → {result.invoiced_amount:,}'
+            f'（{result.invoiced_amount - result.expected_amount:+,}）\n'
+        )
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from lunch.db_router import REPLICA_ALIAS
+
+SQLITE = 'django.db.backends.sqlite3'
+
+
+class Command(BaseCommand):
+    help = "SQLite 構成で、default のバックアップを読み取りレプリカ（REPLICA_DATABASE_URL）に作り直します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='指定すると、その秒数ごとに繰り返す（0 なら 1 回で終了）')
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASES.get(REPLICA_ALIAS)
+        if replica is None:
+            raise CommandError('REPLICA_DATABASE_URL が設定されていません')
+        if settings.DATABASES['default']['ENGINE'] != SQLITE or replica['ENGINE'] != SQLITE:
+            raise CommandError('このコマンドは default・レプリカとも SQLite の場合だけ使えます'
+                               '（PostgreSQL ではサーバー側のレプリケーションを使ってください）')
+        if options['interval'] < 0:
+            raise CommandError('--interval には 0 以上を指定してください')
+
+        while True:
+            close_old_connections()
+            started = time.perf_counter()
+            size = self.refresh(str(replica['NAME']))
+            self.stdout.write(self.style.SUCCESS(
+                f'レプリカを更新しました（{size / 1024 / 1024:.1f} MB, '
+                f'{time.perf_counter() - started:.2f} 秒）'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def refresh(self, path):
+        """
+        default を一時ファイルにバックアップしてから置き換える。読み取り中の接続は
+        古いファイルを読み続け、次に接続し直したとき（CONN_MAX_AGE 以内）新しい方を読む。
+        """
+        source = connections['default']
+        source.ensure_connection()
+        tmp = f'{path}.tmp-{os.getpid()}'
+        dest = sqlite3.connect(tmp)
+        try:
+            # SQLite のオンラインバックアップ。書き込みは一括コピーの間だけ待たされる
+            source.connection.backup(dest)
+        finally:
+            dest.close()
+        os.replace(tmp, path)
+        connections[REPLICA_ALIAS].close()
+        return os.path.getsize(path)
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from lunch.events import order_events
+from lunch.models import DailyOrderCounter
+
+
+class Command(BaseCommand):
+    help = "日別注文数（DailyOrderCounter）を Order から再計算します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='再計算する日 YYYY-MM-DD（省略時は今日）')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, default=None,
+                            help='期間指定の開始日 YYYY-MM-DD')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, default=None,
+                            help='期間指定の終了日 YYYY-MM-DD（省略時は開始日から今日まで）')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            start = options['start']
+            end   = options['end'] or date.today()
+        elif options['end']:
+            raise CommandError('--to を使うときは --from も指定してください')
+        else:
+            start = end = options['date'] or date.today()
+        if start > end:
+            raise CommandError('開始日が終了日より後になっています')
+
+        # 長い期間でも 1 回のトランザクションが大きくなりすぎないよう月単位で処理
+        d = start
+        while d <= end:
+            chunk_end = min(end, d + timedelta(days=30))
+            DailyOrderCounter.rebuild(d, chunk_end)
+            d = chunk_end + timedelta(days=1)
+        order_events.publish_after_commit(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f'{start:%Y-%m-%d}〜{end:%Y-%m-%d} の日別注文数を再計算しました'
+        ))
@@ -3,8 +3,11 @@ from datetime import date, datetime
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from lunch.models import Order, LunchConfig
+from lunch.business_calendar import get_business_calendar
+from lunch.db_router import use_replica
+from lunch.reports import monthly_totals
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, numbers
+from openpyxl.styles import Font, Alignment, PatternFill
 
 class Command(BaseCommand):
     help = "月末ランチ注文レポートを Excel で出力します"
@@ -13,6 +16,7 @@ class Command(BaseCommand):
         parser.add_argument('--year',  type=int, default=date.today().year)
         parser.add_argument('--month', type=int, default=date.today().month)
 
+    @use_replica()   # 読み取りはレプリカから（LunchConfig の自動作成は default へ書く）
     def handle(self, *args, **options):
         # ── LunchConfig の取得 or 作成 ──
         cfg, created = LunchConfig.objects.get_or_create(
@@ -29,6 +33,15 @@ class Command(BaseCommand):
         days  = calendar.monthrange(year, month)[1]
         users = User.objects.all().order_by('username')
 
+        # 集計は画面の月次レポートと同じ（lunch.reports.monthly_totals）
+        totals        = monthly_totals(year, month)
+        limit         = totals.limit
+        user_days     = totals.user_days
+        daily_totals  = totals.daily_totals
+        vendor_totals = totals.vendor_totals
+        grand_price   = totals.grand_price
+        grand_subsidy = totals.grand_subsidy
+
         # ワークブック＆シート
         wb  = Workbook()
         ws  = wb.active
@@ -63,11 +76,12 @@ class Command(BaseCommand):
             cell.font = Font(bold=True)
             cell.fill = PatternFill("solid", fgColor="DDDDDD")
             cell.alignment = Alignment(horizontal='center')
-        # ── 週末列を灰色にするための列インデックスリスト作成 ──
+        # ── 週末・祝日・休業日列を灰色にするための列インデックスリスト作成 ──
+        business_cal = get_business_calendar()
         weekend_cols = []
         for d in range(1, days+1):
             wd = datetime(year, month, d).weekday()  # 5=土,6=日
-            if wd in (5, 6):
+            if wd in (5, 6) or not business_cal.is_open(date(year, month, d)):
                 # 「コード」「氏名」を飛ばして、日付列は3列目から始まる
                 weekend_cols.append(2 + d)
 
@@ -77,20 +91,13 @@ class Command(BaseCommand):
             name = user.get_full_name() or user.username
 
             # 日別フラグ
-            flags = [
-                1 if Order.objects.filter(
-                        user=user,
-                        order_date=date(year, month, d),
-                        canceled=False
-                   ).exists() else 0
-                for d in range(1, days+1)
-            ]
+            ordered_days = user_days.get(user.id, {})
+            flags = [1 if d in ordered_days else 0 for d in range(1, days+1)]
 
-            # 集計
+            # 集計（金額は注文日ごとの価格の合計）
             total_qty     = sum(flags)
-            total_price   = total_qty * cfg.price
-            total_subsidy = total_qty * cfg.subsidy
-            limit         = cfg.monthly_limit
+            total_price   = sum(p.price for p in ordered_days.values())
+            total_subsidy = sum(p.subsidy for p in ordered_days.values())
             company_pay   = min(total_subsidy, limit)
             over          = max(0, total_subsidy - limit)
             user_pay      = total_price - company_pay
@@ -127,17 +134,11 @@ class Command(BaseCommand):
         # 日別合計行
         total_row = ['', '合計']
         # 日別合計
-        for d in range(1, days+1):
-            cnt = Order.objects.filter(
-                order_date=date(year, month, d),
-                canceled=False
-            ).count()
-            total_row.append(cnt)
+        total_row += daily_totals
         # 合計列集計
-        total_qty     = sum(total_row[2:2+days])
-        total_price   = total_qty * cfg.price
-        total_subsidy = total_qty * cfg.subsidy
-        limit         = cfg.monthly_limit
+        total_qty     = sum(daily_totals)
+        total_price   = grand_price
+        total_subsidy = grand_subsidy
         company_pay   = min(total_subsidy, limit)
         over          = max(0, total_subsidy - limit)
         user_pay      = total_price - company_pay
@@ -177,14 +178,7 @@ class Command(BaseCommand):
         start = ws.max_row + 2
         ws.cell(row=start, column=1, value='≪ベンダー集計≫').font = Font(bold=True)
         for i, (code, name) in enumerate(Order.VENDORS, start= start+1):
-            qs = Order.objects.filter(
-                order_date__year=year,
-                order_date__month=month,
-                vendor=code,
-                canceled=False
-            )
-            cnt = qs.count()
-            amt = sum(o.price for o in qs)
+            cnt, amt = vendor_totals[code]
             ws.cell(row=i, column=2, value=name)
             ws.cell(row=i, column=days+3, value=cnt)
             ws.cell(row=i, column=days+4, value=amt)
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from lunch.jobs import claim_next, prune, run_job, worker_name
+
+
+# 終わったジョブの削除（prune）を行う間隔（秒）
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "レポート・FAX 生成ジョブを処理するワーカーを起動します（複数起動可）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='待機中ジョブが無いときの確認間隔（秒）')
+        parser.add_argument('--once', action='store_true',
+                            help='待機中のジョブを処理し終えたら終了する')
+
+    def handle(self, *args, **options):
+        name = worker_name()
+        self.stdout.write(f'ワーカー {name} を起動しました')
+        pruned_at = None
+        while True:
+            close_old_connections()
+            if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                pruned = prune()
+                if pruned:
+                    self.stdout.write(f'保存期間を過ぎたジョブ {pruned} 件を削除しました')
+                pruned_at = time.monotonic()
+            job = claim_next(name)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+            self.stdout.write(f'{job} を開始')
+            job = run_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'{job} → {job.output.name}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'{job}\n{job.error}'))
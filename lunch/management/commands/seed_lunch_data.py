@@ -0,0 +1,128 @@
+import calendar
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from lunch.models import Order, DailyOrderCounter, MonthlyDataVersion
+
+
+def parse_mix(value, choices):
+    """
+    "veg17=6,yamajin=3,kaachan=1" のような文字列を (コード一覧, 重み一覧) に変換する。
+    """
+    valid = {code for code, _ in choices}
+    codes, weights = [], []
+    for part in value.split(','):
+        code, _, weight = part.partition('=')
+        code = code.strip()
+        if code not in valid:
+            raise CommandError(f'不明なコードです: {code}（指定可能: {", ".join(sorted(valid))}）')
+        try:
+            w = float(weight)
+        except ValueError:
+            raise CommandError(f'重みが数値ではありません: {part}')
+        codes.append(code)
+        weights.append(w)
+    if sum(weights) <= 0:
+        raise CommandError(f'重みの合計が 0 です: {value}')
+    return codes, weights
+
+
+class Command(BaseCommand):
+    help = "性能検証用にダミーのユーザーと注文データを一括作成します"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users',  type=int, default=100, help='作成するユーザー数')
+        parser.add_argument('--months', type=int, default=12,  help='注文を作成する月数（当月から遡る）')
+        parser.add_argument('--order-rate',   type=float, default=0.7, help='1日あたりの注文確率 (0〜1)')
+        parser.add_argument('--cancel-ratio', type=float, default=0.05, help='注文のうちキャンセル済にする割合 (0〜1)')
+        parser.add_argument('--vendor-mix', default='veg17=6,yamajin=3,kaachan=1',
+                            help='ベンダーの比率 例: veg17=6,yamajin=3,kaachan=1')
+        parser.add_argument('--rice-mix', default='大=2,中=6,小=2',
+                            help='ライスサイズの比率 例: 大=2,中=6,小=2')
+        parser.add_argument('--batch-size', type=int, default=5000, help='bulk_create のバッチサイズ')
+        parser.add_argument('--prefix', default='seed', help='作成するユーザー名の接頭辞')
+        parser.add_argument('--seed', type=int, default=None, help='乱数シード（再現用）')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['order_rate'] <= 1 or not 0 <= options['cancel_ratio'] <= 1:
+            raise CommandError('--order-rate と --cancel-ratio は 0〜1 で指定してください')
+        if options['months'] < 1 or options['users'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--months, --users, --batch-size には正の値を指定してください')
+
+        rng        = random.Random(options['seed'])
+        vendors    = parse_mix(options['vendor_mix'], Order.VENDORS)
+        rice_sizes = parse_mix(options['rice_mix'], Order.RICE_SIZES)
+        batch_size = options['batch_size']
+
+        # ── ユーザー作成（既存の同名ユーザーはそのまま再利用） ──
+        User   = get_user_model()
+        prefix = options['prefix']
+        names  = [f'{prefix}{i:05d}' for i in range(1, options['users'] + 1)]
+        new_users = []
+        for name in names:
+            u = User(username=name, first_name=name)
+            u.set_unusable_password()
+            new_users.append(u)
+        User.objects.bulk_create(new_users, batch_size=batch_size, ignore_conflicts=True)
+        user_ids = list(
+            User.objects.filter(username__in=names).order_by('username').values_list('id', flat=True)
+        )
+        self.stdout.write(f'ユーザー: {len(user_ids)} 件')
+
+        # ── 対象期間（当月を含めて months ヶ月遡る） ──
+        today = date.today()
+        y, m = today.year, today.month
+        for _ in range(options['months'] - 1):
+            y, m = (y - 1, 12) if m == 1 else (y, m - 1)
+        start = date(y, m, 1)
+        end   = date(today.year, today.month, calendar.monthrange(today.year, today.month)[1])
+        days  = []
+        d = start
+        while d <= end:
+            if d.weekday() != 6:  # 日曜は休業
+                days.append(d)
+            d += timedelta(days=1)
+
+        # ── 注文作成（batch_size 件ごとに bulk_create） ──
+        now     = timezone.now()
+        created = 0
+        batch   = []
+
+        def flush():
+            nonlocal created
+            with transaction.atomic():
+                Order.objects.bulk_create(batch, ignore_conflicts=True)
+            created += len(batch)
+            batch.clear()
+
+        for uid in user_ids:
+            for d in days:
+                if rng.random() >= options['order_rate']:
+                    continue
+                canceled = rng.random() < options['cancel_ratio']
+                batch.append(Order(
+                    user_id=uid,
+                    order_date=d,
+                    vendor=rng.choices(*vendors)[0],
+                    rice_size=rng.choices(*rice_sizes)[0],
+                    status='sent' if d < today else 'pending',
+                    canceled=canceled,
+                    canceled_at=now if canceled else None,
+                ))
+                if len(batch) >= batch_size:
+                    flush()
+        if batch:
+            flush()
+
+        # bulk_create は注文切り替えの経路を通らないので日別注文数はまとめて作り直す
+        DailyOrderCounter.rebuild(start, end)
+        # 同じく月次レポートのキャッシュも無効にする（ユーザーも bulk_create で追加している）
+        MonthlyDataVersion.bump(*days)
+        MonthlyDataVersion.bump_users()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{start:%Y-%m-%d}〜{end:%Y-%m-%d} の注文を {created} 件作成しました'
+        ))
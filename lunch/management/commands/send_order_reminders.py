@@ -0,0 +1,52 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from lunch.business_calendar import get_business_calendar
+from lunch.reminders import send_reminders
+
+
+class Command(BaseCommand):
+    help = "次の営業日の注文が無いユーザーにリマインダーメールを送ります（締め切り前に cron で実行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, default=None,
+                            help='対象日 YYYY-MM-DD（省略時は今日より後の最初の営業日）')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='1 回にまとめて送る通数（既定は LUNCH_REMINDER_BATCH_SIZE）')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='毎秒の上限通数（0 で無制限、既定は LUNCH_REMINDER_RATE）')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='送信先を表示するだけで送らない')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size には 1 以上を指定してください')
+        if options['rate'] is not None and options['rate'] < 0:
+            raise CommandError('--rate には 0 以上を指定してください')
+
+        calendar = get_business_calendar()
+        day = options['date']
+        if day is None:
+            day = calendar.next_open_days(date.today() + timedelta(days=1), 1)[0]
+        elif not calendar.is_open(day):
+            self.stdout.write(f'{day:%Y-%m-%d} は営業日ではないため送信しません')
+            return
+
+        started = time.perf_counter()
+        result = send_reminders(
+            day, dry_run=options['dry_run'],
+            batch_size=options['batch_size'], rate=options['rate'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            for username, email in result.recipients:
+                self.stdout.write(f'{username} <{email}>')
+            self.stdout.write(self.style.SUCCESS(
+                f'（dry-run）{day:%Y-%m-%d}: {len(result.recipients)} 人に送信します'
+            ))
+            return
+        style = self.style.WARNING if result.failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{day:%Y-%m-%d}: {result.sent} 通送信、失敗 {result.failed} 通（{elapsed:.1f} 秒）'
+        ))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0003_order_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Holiday",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="日付")),
+                ("name", models.CharField(max_length=50, verbose_name="名称")),
+            ],
+            options={
+                "verbose_name": "休業日",
+                "verbose_name_plural": "休業日",
+                "ordering": ("date",),
+            },
+        ),
+    ]
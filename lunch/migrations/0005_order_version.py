@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0004_holiday"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="version",
+            field=models.PositiveIntegerField(default=0, verbose_name="バージョン"),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """既存の注文から日別注文数を作成する"""
+    Order = apps.get_model("lunch", "Order")
+    DailyOrderCounter = apps.get_model("lunch", "DailyOrderCounter")
+    rows = (
+        Order.objects.filter(canceled=False)
+        .values_list("order_date", "vendor", "rice_size")
+        .annotate(n=models.Count("id"))
+        .order_by()
+    )
+    DailyOrderCounter.objects.bulk_create(
+        [
+            DailyOrderCounter(date=d, vendor=v, rice_size=r, count=n)
+            for d, v, r, n in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0005_order_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOrderCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="日付")),
+                (
+                    "vendor",
+                    models.CharField(
+                        choices=[
+                            ("veg17", "ベジタブルディッシュ17"),
+                            ("yamajin", "やまじん"),
+                            ("kaachan", "かあちゃんの台所"),
+                        ],
+                        max_length=20,
+                        verbose_name="ベンダー",
+                    ),
+                ),
+                (
+                    "rice_size",
+                    models.CharField(
+                        choices=[
+                            ("大", "ライス大"),
+                            ("中", "ライス中"),
+                            ("小", "ライス小"),
+                        ],
+                        max_length=2,
+                        verbose_name="ライス",
+                    ),
+                ),
+                ("count", models.IntegerField(default=0, verbose_name="注文数")),
+            ],
+            options={
+                "verbose_name": "日別注文数",
+                "verbose_name_plural": "日別注文数",
+                "unique_together": {("date", "vendor", "rice_size")},
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2 on 2026-10-19 11:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0006_dailyordercounter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("monthly_report", "月次レポート (Excel)"),
+                            ("fax_pdf", "発注FAX (PDF)"),
+                            ("fax_excel", "発注書 (Excel)"),
+                        ],
+                        max_length=20,
+                        verbose_name="種類",
+                    ),
+                ),
+                (
+                    "params",
+                    models.JSONField(
+                        blank=True, default=dict, verbose_name="パラメータ"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "待機中"),
+                            ("running", "実行中"),
+                            ("done", "完了"),
+                            ("failed", "失敗"),
+                        ],
+                        default="queued",
+                        max_length=10,
+                        verbose_name="状態",
+                    ),
+                ),
+                (
+                    "progress",
+                    models.PositiveSmallIntegerField(default=0, verbose_name="進捗(%)"),
+                ),
+                (
+                    "output",
+                    models.FileField(
+                        blank=True,
+                        upload_to="lunch_jobs/%Y/%m/",
+                        verbose_name="出力ファイル",
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="ファイル名"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="エラー")),
+                (
+                    "worker",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="処理ワーカー"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="登録日時"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="開始日時"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="終了日時"
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "生成ジョブ",
+                "verbose_name_plural": "生成ジョブ",
+                "ordering": ("-id",),
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="lunch_repor_status_7b7012_idx"
+                    )
+                ],
+            },
+        ),
+    ]
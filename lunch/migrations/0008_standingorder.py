@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0007_reportjob"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StandingOrder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "weekdays",
+                    models.PositiveSmallIntegerField(default=31, verbose_name="曜日"),
+                ),
+                (
+                    "vendor",
+                    models.CharField(
+                        choices=[
+                            ("veg17", "ベジタブルディッシュ17"),
+                            ("yamajin", "やまじん"),
+                            ("kaachan", "かあちゃんの台所"),
+                        ],
+                        default="veg17",
+                        max_length=20,
+                        verbose_name="ベンダー",
+                    ),
+                ),
+                (
+                    "rice_size",
+                    models.CharField(
+                        choices=[
+                            ("大", "ライス大"),
+                            ("中", "ライス中"),
+                            ("小", "ライス小"),
+                        ],
+                        default="中",
+                        max_length=2,
+                        verbose_name="ライス",
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(default=1, verbose_name="数量"),
+                ),
+                ("start_date", models.DateField(verbose_name="開始日")),
+                (
+                    "end_date",
+                    models.DateField(blank=True, null=True, verbose_name="終了日"),
+                ),
+                ("active", models.BooleanField(default=True, verbose_name="有効")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="ユーザー",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "定期注文",
+                "verbose_name_plural": "定期注文",
+                "ordering": ("user", "start_date"),
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0008_standingorder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="更新日時"),
+        ),
+        migrations.CreateModel(
+            name="MonthlyDataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="年")),
+                ("month", models.PositiveSmallIntegerField(verbose_name="月")),
+                (
+                    "version",
+                    models.PositiveIntegerField(default=0, verbose_name="バージョン"),
+                ),
+            ],
+            options={
+                "verbose_name": "月別データバージョン",
+                "verbose_name_plural": "月別データバージョン",
+                "unique_together": {("year", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0009_monthly_data_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderAuditLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(db_index=True, verbose_name="日時"),
+                ),
+                (
+                    "actor_id",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="操作ユーザーID"
+                    ),
+                ),
+                (
+                    "actor",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="操作ユーザー"
+                    ),
+                ),
+                (
+                    "order_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="注文ID"
+                    ),
+                ),
+                ("order_user_id", models.IntegerField(verbose_name="注文者ID")),
+                ("order_date", models.DateField(verbose_name="注文日")),
+                ("vendor", models.CharField(max_length=20, verbose_name="ベンダー")),
+                ("rice_size", models.CharField(max_length=2, verbose_name="ライス")),
+                (
+                    "old_state",
+                    models.CharField(
+                        choices=[
+                            ("none", "注文なし"),
+                            ("ordered", "注文"),
+                            ("canceled", "キャンセル"),
+                            ("deleted", "削除"),
+                        ],
+                        max_length=10,
+                        verbose_name="変更前",
+                    ),
+                ),
+                (
+                    "new_state",
+                    models.CharField(
+                        choices=[
+                            ("none", "注文なし"),
+                            ("ordered", "注文"),
+                            ("canceled", "キャンセル"),
+                            ("deleted", "削除"),
+                        ],
+                        max_length=10,
+                        verbose_name="変更後",
+                    ),
+                ),
+                ("source", models.CharField(max_length=30, verbose_name="操作元")),
+            ],
+            options={
+                "verbose_name": "注文の変更履歴",
+                "verbose_name_plural": "注文の変更履歴",
+                "indexes": [
+                    models.Index(
+                        fields=["order_user_id", "order_date"],
+                        name="lunch_order_order_u_1c5436_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:54
+
+import datetime
+
+from django.db import migrations, models
+
+
+def initial_rule(apps, schema_editor):
+    """最新の LunchConfig の値（無ければモデルの既定値）を最初の共通の行にする"""
+    LunchConfig = apps.get_model("lunch", "LunchConfig")
+    PriceRule = apps.get_model("lunch", "PriceRule")
+    fields = ("price", "subsidy", "monthly_limit")
+    cfg = LunchConfig.objects.order_by("-id").values(*fields).first()
+    if cfg is None:
+        cfg = {name: LunchConfig._meta.get_field(name).default for name in fields}
+    PriceRule.objects.create(
+        effective_from=datetime.date(2000, 1, 1),
+        vendor="",
+        **cfg,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0010_orderauditlog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("effective_from", models.DateField(verbose_name="適用開始日")),
+                (
+                    "vendor",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("veg17", "ベジタブルディッシュ17"),
+                            ("yamajin", "やまじん"),
+                            ("kaachan", "かあちゃんの台所"),
+                        ],
+                        help_text="空欄は全ベンダー共通",
+                        max_length=20,
+                        verbose_name="ベンダー",
+                    ),
+                ),
+                ("price", models.IntegerField(verbose_name="お弁当価格")),
+                ("subsidy", models.IntegerField(verbose_name="会社補助額")),
+                (
+                    "monthly_limit",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="共通の行でのみ使用（ベンダー別の行では空欄）",
+                        null=True,
+                        verbose_name="会社負担上限額",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "料金設定",
+                "verbose_name_plural": "料金設定",
+                "ordering": ("vendor", "effective_from"),
+                "unique_together": {("vendor", "effective_from")},
+            },
+        ),
+        migrations.RunPython(initial_rule, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0011_pricerule"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "order_date", "id"],
+                name="lunch_order_user_id_9a15cd_idx",
+            ),
+        ),
+    ]
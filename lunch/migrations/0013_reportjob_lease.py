@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lunch", "0012_order_history_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0, verbose_name="実行回数"),
+        ),
+        migrations.AddField(
+            model_name="reportjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="最終応答日時"
+            ),
+        ),
+    ]
@@ -1,6 +1,8 @@
 
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 class LunchConfig(models.Model):
@@ -45,6 +47,313 @@ class Order(models.Model):
     )
     canceled    = models.BooleanField(default=False)
     canceled_at = models.DateTimeField(null=True, blank=True)
+    # 楽観的排他用。canceled を切り替えるたびに +1 する
+    version     = models.PositiveIntegerField(default=0, verbose_name="バージョン")
+    updated_at  = models.DateTimeField(auto_now=True, verbose_name="更新日時")
 
     class Meta:
         unique_together = ('user','order_date','vendor','rice_size')
+        # 注文履歴の (order_date, id) キーセットページング用
+        indexes = [models.Index(fields=['user', 'order_date', 'id'])]
+
+    def set_canceled(self, canceled: bool) -> bool:
+        """
+        読み取り時から version が変わっていなければ canceled を切り替える（楽観的排他）。
+        UPDATE ... WHERE version = ? の 1 文で行い、行ロックは取らない。
+        他のリクエストが先に更新していた、または発注済になっていた場合は False。
+        既に指定の状態なら何も書き込まずに True を返す（version も進めない）。
+        日別注文数（DailyOrderCounter）も同じトランザクションで増減する。
+        """
+        if self.canceled == canceled:
+            return True
+        canceled_at = timezone.now() if canceled else None
+        with transaction.atomic():
+            updated = Order.objects.filter(
+                pk=self.pk, version=self.version, status='pending',
+            ).update(
+                canceled=canceled,
+                canceled_at=canceled_at,
+                version=models.F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            # version が一致した = DB 上の canceled は読み取り時の self.canceled のまま
+            if updated:
+                DailyOrderCounter.add(
+                    self.order_date, self.vendor, self.rice_size, -1 if canceled else 1
+                )
+                MonthlyDataVersion.bump(self.order_date)
+        if updated:
+            self.canceled    = canceled
+            self.canceled_at = canceled_at
+            self.version    += 1
+        return bool(updated)
+
+class Holiday(models.Model):
+    """会社独自の休業日（年末年始・夏季休業など）。日本の祝日は自動計算されるので登録不要"""
+    date = models.DateField(unique=True, verbose_name="日付")
+    name = models.CharField(max_length=50, verbose_name="名称")
+
+    class Meta:
+        ordering            = ('date',)
+        verbose_name        = "休業日"
+        verbose_name_plural = "休業日"
+
+    def __str__(self):
+        return f"{self.date:%Y-%m-%d} {self.name}"
+
+class DailyOrderCounter(models.Model):
+    """
+    日付・ベンダー・ライスサイズごとの有効な（キャンセルされていない）注文数。
+    注文の切り替えと同じトランザクション内で F() により増減させる。
+    ずれた場合は repair_daily_counters コマンドで Order から再計算できる。
+    """
+    date      = models.DateField(verbose_name="日付")
+    vendor    = models.CharField(max_length=20, choices=Order.VENDORS, verbose_name="ベンダー")
+    rice_size = models.CharField(max_length=2, choices=Order.RICE_SIZES, verbose_name="ライス")
+    count     = models.IntegerField(default=0, verbose_name="注文数")
+
+    class Meta:
+        unique_together     = ('date', 'vendor', 'rice_size')
+        verbose_name        = "日別注文数"
+        verbose_name_plural = "日別注文数"
+
+    def __str__(self):
+        return f"{self.date:%Y-%m-%d} {self.vendor} {self.rice_size}: {self.count}"
+
+    @classmethod
+    def add(cls, order_date, vendor, rice_size, delta):
+        """該当行の count に delta を加える（行が無ければ作る）。呼び出し側の atomic 内で使う"""
+        key = {'date': order_date, 'vendor': vendor, 'rice_size': rice_size}
+        if not cls.objects.filter(**key).update(count=models.F('count') + delta):
+            cls.objects.get_or_create(**key)
+            cls.objects.filter(**key).update(count=models.F('count') + delta)
+
+    @classmethod
+    def rebuild(cls, start, end=None):
+        """start〜end（省略時は start の 1 日）の行を Order から集計し直す"""
+        end = end or start
+        rows = (
+            Order.objects.filter(order_date__range=(start, end), canceled=False)
+            .values_list('order_date', 'vendor', 'rice_size')
+            .annotate(n=models.Count('id'))
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.filter(date__range=(start, end)).delete()
+            cls.objects.bulk_create([
+                cls(date=d, vendor=v, rice_size=r, count=n) for d, v, r, n in rows
+            ])
+
+    @classmethod
+    def counts_for(cls, day, vendor=None) -> dict:
+        """day のライスサイズ別注文数 {'大': n, '中': n, '小': n}（vendor 指定でそのベンダーのみ）"""
+        counts = {code: 0 for code, _ in Order.RICE_SIZES}
+        qs = cls.objects.filter(date=day)
+        if vendor:
+            qs = qs.filter(vendor=vendor)
+        for rice_size, n in qs.values_list('rice_size', 'count'):
+            counts[rice_size] = counts.get(rice_size, 0) + n
+        return counts
+
+
+def order_deleted(sender, instance, **kwargs):
+    """
+    post_delete（apps.py で接続）。有効な注文が削除されたら日別注文数から引く。
+    QuerySet.delete() やユーザー削除のカスケードでも 1 件ずつ呼ばれる。
+    """
+    if not instance.canceled:
+        DailyOrderCounter.add(instance.order_date, instance.vendor, instance.rice_size, -1)
+
+
+class PriceRule(models.Model):
+    """
+    適用開始日つきの価格・補助額・上限。レポートは注文日時点で有効な行を使う
+    （pricing.py）。ベンダー空欄の行は全ベンダー共通で、ベンダー指定の行は
+    適用開始日以降そのベンダーについて共通の行より優先する。
+    会社負担の上限は共通の行の値を、その月の 1 日時点で使う。
+    """
+    effective_from = models.DateField(verbose_name="適用開始日")
+    vendor         = models.CharField(
+        max_length=20, choices=Order.VENDORS, blank=True, verbose_name="ベンダー",
+        help_text="空欄は全ベンダー共通",
+    )
+    price          = models.IntegerField(verbose_name="お弁当価格")
+    subsidy        = models.IntegerField(verbose_name="会社補助額")
+    monthly_limit  = models.IntegerField(
+        null=True, blank=True, verbose_name="会社負担上限額",
+        help_text="共通の行でのみ使用（ベンダー別の行では空欄）",
+    )
+    updated_at     = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together     = ('vendor', 'effective_from')
+        ordering            = ('vendor', 'effective_from')
+        verbose_name        = "料金設定"
+        verbose_name_plural = "料金設定"
+
+    def __str__(self):
+        vendor = self.get_vendor_display() or '共通'
+        return f"{self.effective_from:%Y-%m-%d}〜 {vendor} 価格:{self.price} 補助:{self.subsidy}"
+
+    def clean(self):
+        if not self.vendor and self.monthly_limit is None:
+            raise ValidationError({'monthly_limit': '共通の行では上限額を入力してください'})
+
+
+class MonthlyDataVersion(models.Model):
+    """
+    月ごとの注文データのバージョン。その月の注文が変わるたびに +1 し、
+    月次レポートのキャッシュキーに使う（report_cache.py）。
+    year=0, month=0 の行はユーザー一覧（レポートの行）の変更用。
+    """
+    year    = models.PositiveSmallIntegerField(verbose_name="年")
+    month   = models.PositiveSmallIntegerField(verbose_name="月")
+    version = models.PositiveIntegerField(default=0, verbose_name="バージョン")
+
+    class Meta:
+        unique_together     = ('year', 'month')
+        verbose_name        = "月別データバージョン"
+        verbose_name_plural = "月別データバージョン"
+
+    def __str__(self):
+        return f"{self.year}/{self.month}: {self.version}"
+
+    @classmethod
+    def bump(cls, *days):
+        """days（日付）を含む月のバージョンを +1 する。注文を書き込むトランザクション内で使う"""
+        for year, month in {(d.year, d.month) for d in days}:
+            cls._bump(year, month)
+
+    @classmethod
+    def bump_users(cls):
+        cls._bump(0, 0)
+
+    @classmethod
+    def _bump(cls, year, month):
+        key = {'year': year, 'month': month}
+        if not cls.objects.filter(**key).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(**key)
+            cls.objects.filter(**key).update(version=models.F('version') + 1)
+
+    @classmethod
+    def versions_for(cls, year, month) -> tuple[int, int]:
+        """(その月のバージョン, ユーザー一覧のバージョン) をクエリ 1 回で返す"""
+        rows = dict(
+            cls.objects.filter(
+                models.Q(year=year, month=month) | models.Q(year=0, month=0)
+            ).values_list('year', 'version')
+        )
+        return rows.get(year, 0), rows.get(0, 0)
+
+
+class ReportJob(models.Model):
+    """
+    レポート・FAX をバックグラウンドで生成するジョブ。
+    画面から登録し、run_lunch_worker コマンドが順に処理する。
+    """
+    KINDS = [
+        ('monthly_report', '月次レポート (Excel)'),
+        ('fax_pdf',        '発注FAX (PDF)'),
+        ('fax_excel',      '発注書 (Excel)'),
+    ]
+    STATUSES = [
+        ('queued',  '待機中'),
+        ('running', '実行中'),
+        ('done',    '完了'),
+        ('failed',  '失敗'),
+    ]
+
+    kind         = models.CharField(max_length=20, choices=KINDS, verbose_name="種類")
+    params       = models.JSONField(default=dict, blank=True, verbose_name="パラメータ")
+    status       = models.CharField(max_length=10, choices=STATUSES, default='queued', verbose_name="状態")
+    progress     = models.PositiveSmallIntegerField(default=0, verbose_name="進捗(%)")
+    output       = models.FileField(upload_to='lunch_jobs/%Y/%m/', blank=True, verbose_name="出力ファイル")
+    filename     = models.CharField(max_length=100, blank=True, verbose_name="ファイル名")
+    error        = models.TextField(blank=True, verbose_name="エラー")
+    worker       = models.CharField(max_length=100, blank=True, verbose_name="処理ワーカー")
+    created_by   = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at   = models.DateTimeField(auto_now_add=True, verbose_name="登録日時")
+    started_at   = models.DateTimeField(null=True, blank=True, verbose_name="開始日時")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="最終応答日時")
+    attempts     = models.PositiveSmallIntegerField(default=0, verbose_name="実行回数")
+    finished_at  = models.DateTimeField(null=True, blank=True, verbose_name="終了日時")
+
+    class Meta:
+        ordering            = ('-id',)
+        indexes             = [models.Index(fields=['status', 'id'])]
+        verbose_name        = "生成ジョブ"
+        verbose_name_plural = "生成ジョブ"
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_kind_display()} ({self.get_status_display()})"
+
+
+class StandingOrder(models.Model):
+    """
+    毎週決まった曜日の定期注文。
+    materialize_standing_orders コマンドが注文変更可能期間の Order を先に作っておく。
+    作られた注文は通常の注文と同じで、カレンダーからキャンセルすればその日だけ休める。
+    """
+    WEEKDAYS = ['月', '火', '水', '木', '金', '土', '日']
+
+    user       = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="ユーザー")
+    # 曜日のビットマスク（bit0 = 月曜 … bit6 = 日曜。date.weekday() と同じ並び）
+    weekdays   = models.PositiveSmallIntegerField(default=0b11111, verbose_name="曜日")
+    vendor     = models.CharField(max_length=20, choices=Order.VENDORS, default='veg17', verbose_name="ベンダー")
+    rice_size  = models.CharField(max_length=2, choices=Order.RICE_SIZES, default='中', verbose_name="ライス")
+    quantity   = models.PositiveIntegerField(default=1, verbose_name="数量")
+    start_date = models.DateField(verbose_name="開始日")
+    end_date   = models.DateField(null=True, blank=True, verbose_name="終了日")
+    active     = models.BooleanField(default=True, verbose_name="有効")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name        = "定期注文"
+        verbose_name_plural = "定期注文"
+        ordering = ('user', 'start_date')
+
+    def __str__(self):
+        return f"{self.user} {self.weekday_label()} {self.get_vendor_display()} {self.rice_size}"
+
+    def weekday_label(self):
+        return ''.join(w for i, w in enumerate(self.WEEKDAYS) if self.weekdays & (1 << i))
+
+    def applies_to(self, day) -> bool:
+        return (
+            self.weekdays & (1 << day.weekday()) != 0
+            and self.start_date <= day
+            and (self.end_date is None or day <= self.end_date)
+        )
+
+
+class OrderAuditLog(models.Model):
+    """
+    注文状態の変更履歴（追記のみ）。書き込みは audit.py がメモリに溜めてまとめて行う。
+    注文やユーザーが削除されても履歴は残すため、外部キーにはしない。
+    """
+    STATES = [
+        ('none',     '注文なし'),
+        ('ordered',  '注文'),
+        ('canceled', 'キャンセル'),
+        ('deleted',  '削除'),
+    ]
+
+    created_at    = models.DateTimeField(db_index=True, verbose_name="日時")
+    actor_id      = models.IntegerField(null=True, blank=True, verbose_name="操作ユーザーID")
+    actor         = models.CharField(max_length=150, blank=True, verbose_name="操作ユーザー")
+    order_id      = models.BigIntegerField(null=True, blank=True, verbose_name="注文ID")
+    order_user_id = models.IntegerField(verbose_name="注文者ID")
+    order_date    = models.DateField(verbose_name="注文日")
+    vendor        = models.CharField(max_length=20, verbose_name="ベンダー")
+    rice_size     = models.CharField(max_length=2, verbose_name="ライス")
+    old_state     = models.CharField(max_length=10, choices=STATES, verbose_name="変更前")
+    new_state     = models.CharField(max_length=10, choices=STATES, verbose_name="変更後")
+    source        = models.CharField(max_length=30, verbose_name="操作元")
+
+    class Meta:
+        verbose_name        = "注文の変更履歴"
+        verbose_name_plural = "注文の変更履歴"
+        indexes = [models.Index(fields=['order_user_id', 'order_date'])]
+
+    def __str__(self):
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.order_date} {self.old_state}→{self.new_state} ({self.source})"
@@ -0,0 +1,67 @@
+"""
+注文日時点の価格・補助額・上限を引くための表。
+
+PriceTable.load() で料金設定（PriceRule）をクエリ 1 回で読み込み、ベンダーごとに
+適用開始日の昇順リストを作る。resolve(日付, ベンダー) は二分探索で
+「その日以前で最も新しい行」を返すので、1 か月分でも 1 年分でも注文ごとの
+問い合わせは発生しない。料金設定が 1 行も無い期間は LunchConfig の値を使う。
+"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+
+from .models import LunchConfig, PriceRule
+
+
+@dataclass(frozen=True)
+class Price:
+    price: int
+    subsidy: int
+    monthly_limit: int
+
+
+# LunchConfig も無い場合の値（LunchConfig のフィールド既定値と同じ）
+DEFAULT_PRICE = Price(price=430, subsidy=200, monthly_limit=3780)
+
+
+class PriceTable:
+    def __init__(self, rules, fallback: Price):
+        self.fallback = fallback
+        self._dates  = {}   # ベンダー（'' = 共通） → [適用開始日, ...]（昇順）
+        self._prices = {}   # ベンダー → [Price, ...]（_dates と同じ並び）
+        for vendor, effective_from, price, subsidy, monthly_limit in sorted(
+            rules, key=lambda r: (r[0], r[1])
+        ):
+            self._dates.setdefault(vendor, []).append(effective_from)
+            self._prices.setdefault(vendor, []).append(Price(price, subsidy, monthly_limit))
+
+    @classmethod
+    def load(cls) -> 'PriceTable':
+        rules = PriceRule.objects.values_list(
+            'vendor', 'effective_from', 'price', 'subsidy', 'monthly_limit'
+        )
+        cfg = LunchConfig.objects.order_by('id').first()
+        fallback = Price(cfg.price, cfg.subsidy, cfg.monthly_limit) if cfg else DEFAULT_PRICE
+        return cls(rules, fallback)
+
+    def _find(self, vendor, day):
+        dates = self._dates.get(vendor)
+        if dates:
+            i = bisect_right(dates, day)
+            if i:
+                return self._prices[vendor][i - 1]
+        return None
+
+    def resolve(self, day: date, vendor: str = '') -> Price:
+        """day の vendor の価格（ベンダー別の行 → 共通の行 → LunchConfig の順）"""
+        common = self._find('', day) or self.fallback
+        if vendor:
+            specific = self._find(vendor, day)
+            if specific is not None:
+                # ベンダー別の行は上限額を持たないので共通の値を使う
+                return Price(specific.price, specific.subsidy, common.monthly_limit)
+        return common
+
+    def monthly_limit(self, year: int, month: int) -> int:
+        """その月の会社負担上限額（月初時点の共通の行）"""
+        return self.resolve(date(year, month, 1)).monthly_limit
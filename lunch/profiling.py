@@ -0,0 +1,142 @@
+"""
+スタッフ用のリクエスト単位プロファイラ。
+
+LUNCH_PROFILE_DIR を設定したときだけミドルウェアが有効になり（未設定なら
+MiddlewareNotUsed で読み込み自体を外すので負荷はゼロ）、スタッフが
+?_profile=1 または X-Lunch-Profile: 1 ヘッダー付きで開いたリクエストだけを
+cProfile と tracemalloc の下で実行する。
+
+結果は LUNCH_PROFILE_DIR に 2 ファイルずつ保存する。
+
+    <名前>.prof … pstats 形式（snakeviz / flameprof / gprof2dot でそのまま開ける）
+    <名前>.txt  … 累積時間の上位関数とメモリ確保の多い行の一覧
+
+一覧は /admin/profiles/ で見られる。古いものは LUNCH_PROFILE_KEEP 件を残して削除する。
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+PROFILE_PARAM  = '_profile'
+PROFILE_HEADER = 'X-Lunch-Profile'
+NAME_RE = re.compile(r'^[\w.-]+$')
+
+# tracemalloc はプロセス全体で 1 つなので、同時に計測するのは 1 リクエストだけ
+_lock = threading.Lock()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'LUNCH_PROFILE_DIR', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = str(settings.LUNCH_PROFILE_DIR)
+
+    def __call__(self, request):
+        if PROFILE_PARAM not in request.GET and PROFILE_HEADER not in request.headers:
+            return self.get_response(request)
+        if not (request.user.is_active and request.user.is_staff):
+            return self.get_response(request)
+        if not _lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response[PROFILE_HEADER] = 'busy'
+            return response
+        try:
+            return self._profile(request)
+        finally:
+            _lock.release()
+
+    def _profile(self, request):
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started  = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            elapsed  = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            _, peak  = tracemalloc.get_traced_memory()
+            if not tracing:
+                tracemalloc.stop()
+
+        name = self._save(request, response, profiler, snapshot, elapsed, peak)
+        response[PROFILE_HEADER] = name
+        return response
+
+    def _save(self, request, response, profiler, snapshot, elapsed, peak):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^\w]+', '-', request.path).strip('-') or 'root'
+        now  = timezone.localtime()
+        name = f'{now:%Y%m%d-%H%M%S}-{now.microsecond // 1000:03d}-{slug[:60]}-{os.getpid()}'
+        base = os.path.join(self.directory, name)
+        profiler.dump_stats(base + '.prof')
+
+        out = io.StringIO()
+        out.write(f'{request.method} {request.get_full_path()}\n')
+        out.write(f'user: {request.user.get_username()}\n')
+        out.write(f'status: {response.status_code}\n')
+        out.write(f'elapsed: {elapsed * 1000:.1f} ms\n')
+        out.write(f'peak memory: {peak / 1024:.0f} KiB\n\n')
+        out.write('── 累積時間の上位 40 関数 ──\n')
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(40)
+        out.write('── メモリ確保の多い行（上位 25） ──\n')
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ])
+        for stat in snapshot.statistics('lineno')[:25]:
+            out.write(f'{stat}\n')
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(out.getvalue())
+
+        prune_profiles(self.directory, getattr(settings, 'LUNCH_PROFILE_KEEP', 50))
+        return name
+
+
+def list_profiles(directory) -> list[dict]:
+    """保存済みのプロファイルを新しい順に返す"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for filename in names:
+        if not filename.endswith('.txt'):
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, encoding='utf-8') as f:
+            head = [next(f, '').rstrip('\n') for _ in range(5)]
+        profiles.append({
+            'name':    filename[:-4],
+            'request': head[0],
+            'user':    head[1].partition(': ')[2],
+            'status':  head[2].partition(': ')[2],
+            'elapsed': head[3].partition(': ')[2],
+            'peak':    head[4].partition(': ')[2],
+            'mtime':   os.path.getmtime(path),
+        })
+    profiles.sort(key=lambda p: p['mtime'], reverse=True)
+    return profiles
+
+
+def prune_profiles(directory, keep):
+    for p in list_profiles(directory)[keep:]:
+        for ext in ('.prof', '.txt'):
+            try:
+                os.unlink(os.path.join(directory, p['name'] + ext))
+            except FileNotFoundError:
+                pass
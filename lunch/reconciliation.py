@@ -0,0 +1,204 @@
+"""
+ベンダー請求書と注文の突き合わせ。
+
+請求書（CSV / XLSX）の 1 行 = (日付, ライス, 食数, 金額)。
+注文側はベンダー・期間を指定した 1 回の GROUP BY で (日付, ライス) ごとの
+食数（日別注文数・FAX と同じく 1 注文 = 1 食）を集計し、注文日時点の価格（PriceTable）から金額を出してハッシュ表にする。
+請求書は 1 行ずつ読みながらそのハッシュ表を引く（ハッシュ結合）ので、
+請求書のサイズに関わらずメモリに載るのは (日付, ライス) の組の数だけ。
+
+同じ (日付, ライス) が請求書に複数行あれば合算してから比べる。
+"""
+import csv
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from django.db.models import Count
+
+from .db_router import use_replica
+from .importers import _lookup
+from .models import Order
+from .pricing import PriceTable
+
+
+HEADER_WORDS = {'date', '日付', '納品日', '年月日'}
+
+# 差異の種類
+MISMATCH       = 'mismatch'        # 食数または金額が違う
+NOT_INVOICED   = 'not_invoiced'    # 注文はあるが請求書に無い
+NOT_ORDERED    = 'not_ordered'     # 請求書にあるが注文が無い
+OUT_OF_PERIOD  = 'out_of_period'   # 請求書の日付が照合期間外
+
+KIND_LABELS = {
+    MISMATCH:      '不一致',
+    NOT_INVOICED:  '請求漏れ',
+    NOT_ORDERED:   '注文なし',
+    OUT_OF_PERIOD: '期間外',
+}
+
+
+@dataclass
+class Discrepancy:
+    day: date
+    rice_size: str
+    kind: str
+    ordered_count: int = 0
+    invoiced_count: int = 0
+    expected_amount: int = 0
+    invoiced_amount: int = 0
+
+    @property
+    def kind_label(self):
+        return KIND_LABELS[self.kind]
+
+    @property
+    def count_diff(self):
+        return self.invoiced_count - self.ordered_count
+
+    @property
+    def amount_diff(self):
+        return self.invoiced_amount - self.expected_amount
+
+
+@dataclass
+class ReconcileResult:
+    vendor: str
+    start: date
+    end: date
+    invoice_rows: int = 0
+    ordered_count: int = 0
+    invoiced_count: int = 0
+    expected_amount: int = 0
+    invoiced_amount: int = 0
+    matched: int = 0                                       # 一致した (日付, ライス) の数
+    discrepancies: list = field(default_factory=list)      # [Discrepancy]（日付・ライス順）
+    errors: list = field(default_factory=list)             # [(行番号, 元の行, エラー内容)]
+
+    @property
+    def ok(self):
+        return not self.discrepancies and not self.errors
+
+
+def _to_int(value, label):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value != int(value):
+            raise ValueError(f'{label}が整数ではありません: {value}')
+        return int(value)
+    text = str(value or '').strip().replace(',', '').replace('¥', '').replace('￥', '').replace('円', '')
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f'{label}が不正です: {value}')
+
+
+def _to_date(value):
+    # XLSX のセルは datetime で来る
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value or '').strip()
+    try:
+        return date.fromisoformat(text.replace('/', '-'))
+    except ValueError:
+        raise ValueError(f'日付の形式が不正です: {value}')
+
+
+def iter_csv_rows(lines):
+    """CSV のテキスト行から (行番号, セルのリスト) を返す"""
+    yield from enumerate(csv.reader(lines), start=1)
+
+
+def iter_xlsx_rows(file):
+    """XLSX の先頭シートを read_only で 1 行ずつ読み、(行番号, セルのリスト) を返す"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for lineno, row in enumerate(wb.worksheets[0].iter_rows(values_only=True), start=1):
+            yield lineno, ['' if c is None else c for c in row]
+    finally:
+        wb.close()
+
+
+@use_replica()
+def expected_counts(vendor, start, end, prices=None) -> dict:
+    """
+    start〜end の vendor の有効な注文を (日付, ライス) ごとに集計する（クエリ 1 回、レプリカから）。
+    戻り値は {(日付, ライス): [食数, 金額]}。金額は注文日時点の価格 × 食数。
+    """
+    prices = prices or PriceTable.load()
+    rows = (
+        Order.objects.filter(vendor=vendor, order_date__range=(start, end), canceled=False)
+        .values_list('order_date', 'rice_size')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return {
+        (day, rice): [n, n * prices.resolve(day, vendor).price]
+        for day, rice, n in rows
+    }
+
+
+def reconcile_invoice(rows, vendor, start, end, prices=None) -> ReconcileResult:
+    """
+    rows（iter_csv_rows / iter_xlsx_rows の戻り値）の請求書を、start〜end の
+    vendor の注文と突き合わせる。
+    """
+    result   = ReconcileResult(vendor=vendor, start=start, end=end)
+    expected = expected_counts(vendor, start, end, prices)
+    invoiced = {}        # (日付, ライス) → [食数, 金額]
+    outside  = {}        # 期間外の行（同じく合算）
+    rice_sizes = _lookup(Order.RICE_SIZES)
+
+    for lineno, row in rows:
+        if not row or not any(str(c).strip() for c in row):
+            continue
+        if lineno == 1 and str(row[0]).strip().lower() in HEADER_WORDS:
+            continue
+        try:
+            if len(row) < 4:
+                raise ValueError('列が足りません（日付, ライス, 食数, 金額）')
+            day    = _to_date(row[0])
+            rice   = str(row[1]).strip()
+            count  = _to_int(row[2], '食数')
+            amount = _to_int(row[3], '金額')
+            if rice not in rice_sizes:
+                raise ValueError(f'ライスサイズが不正です: {rice}')
+        except ValueError as e:
+            result.errors.append((lineno, [str(c) for c in row], str(e)))
+            continue
+
+        result.invoice_rows += 1
+        target = invoiced if start <= day <= end else outside
+        totals = target.setdefault((day, rice_sizes[rice]), [0, 0])
+        totals[0] += count
+        totals[1] += amount
+
+    for key in expected.keys() | invoiced.keys():
+        ordered_n, expected_amt = expected.get(key, (0, 0))
+        invoiced_n, invoiced_amt = invoiced.get(key, (0, 0))
+        result.ordered_count   += ordered_n
+        result.expected_amount += expected_amt
+        result.invoiced_count  += invoiced_n
+        result.invoiced_amount += invoiced_amt
+        if ordered_n == invoiced_n and expected_amt == invoiced_amt:
+            result.matched += 1
+            continue
+        if key not in invoiced:
+            kind = NOT_INVOICED
+        elif not ordered_n:
+            kind = NOT_ORDERED
+        else:
+            kind = MISMATCH
+        result.discrepancies.append(Discrepancy(
+            *key, kind, ordered_n, invoiced_n, expected_amt, invoiced_amt,
+        ))
+    for key, (invoiced_n, invoiced_amt) in outside.items():
+        result.discrepancies.append(Discrepancy(
+            *key, OUT_OF_PERIOD, invoiced_count=invoiced_n, invoiced_amount=invoiced_amt,
+        ))
+
+    order = {code: i for i, (code, _) in enumerate(Order.RICE_SIZES)}
+    result.discrepancies.sort(key=lambda d: (d.day, order.get(d.rice_size, 99)))
+    return result
@@ -0,0 +1,113 @@
+"""
+締め切り前の注文リマインダーメール。
+
+対象は「有効なユーザーで、指定日の注文（キャンセル済みを含む）が 1 件も無い人」。
+キャンセル済みの行がある人は自分で取り消したので送らない。
+対象者は NOT EXISTS の反結合 1 回で取得し、ユーザーごとの問い合わせはしない。
+
+送信は接続を 1 本だけ開いて使い回し、batch_size 通ごとに
+connection.send_messages() でまとめて送る（send_mass_mail と同じ方式）。
+SMTP サーバーの流量制限に掛からないよう、rate（通/秒）を超えないように
+バッチの間で待つ。EMAIL_BACKEND を locmem / filebased にすれば実際には送らずに確認できる。
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+
+from .models import Order
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReminderResult:
+    day: date
+    recipients: list = field(default_factory=list)   # [(ユーザー名, メールアドレス)]
+    sent: int = 0
+    failed: int = 0
+
+
+def users_without_order(day: date):
+    """day に注文が無い有効なユーザー（メールアドレスのある人のみ）"""
+    has_order = Order.objects.filter(user=OuterRef('pk'), order_date=day)
+    return (
+        get_user_model().objects
+        .filter(is_active=True)
+        .exclude(email='')
+        .filter(~Exists(has_order))
+        .order_by('pk')
+    )
+
+
+def build_message(user, day: date) -> EmailMessage:
+    context = {
+        'user':     user,
+        'name':     user.get_full_name() or user.username,
+        'day':      day,
+        'site_url': getattr(settings, 'LUNCH_SITE_URL', ''),
+    }
+    subject = render_to_string('lunch/reminder_subject.txt', context).strip()
+    body    = render_to_string('lunch/reminder_body.txt', context)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [user.email])
+
+
+def send_reminders(day: date, dry_run=False, batch_size=None, rate=None) -> ReminderResult:
+    """
+    day の注文が無いユーザーにリマインダーを送る。
+    dry_run なら対象者を集めるだけで接続も開かない。
+    """
+    batch_size = batch_size or getattr(settings, 'LUNCH_REMINDER_BATCH_SIZE', 50)
+    rate       = rate if rate is not None else getattr(settings, 'LUNCH_REMINDER_RATE', 10)
+    result     = ReminderResult(day=day)
+    users = users_without_order(day).only('username', 'email', 'first_name', 'last_name')
+
+    if dry_run:
+        result.recipients = [(u.username, u.email) for u in users.iterator()]
+        return result
+
+    connection = get_connection()
+    connection.open()
+    batch   = []
+    started = time.monotonic()
+
+    def flush():
+        nonlocal connection
+        try:
+            result.sent += connection.send_messages(batch) or 0
+        except Exception:
+            # 1 バッチの失敗で残りを止めない。接続を張り直して続ける
+            logger.exception('リマインダーの送信に失敗しました（%d 通）', len(batch))
+            result.failed += len(batch)
+            try:
+                connection.close()
+                connection = get_connection()
+                connection.open()
+            except Exception:
+                # 張り直せなくても止めない（次のバッチの送信時にもう一度接続する）
+                logger.exception('メールサーバーに再接続できませんでした')
+        batch.clear()
+        # rate 通/秒を超えないよう、ここまでの送信数に見合う時間まで待つ
+        if rate:
+            wait = (result.sent + result.failed) / rate - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+
+    try:
+        for user in users.iterator():
+            result.recipients.append((user.username, user.email))
+            batch.append(build_message(user, day))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        connection.close()
+    return result
@@ -0,0 +1,146 @@
+"""
+月次レポート（Excel）のディスクキャッシュ。
+
+キャッシュキーは (年, 月, ランチ設定・料金設定, 営業日カレンダー,
+その月のデータバージョン, ユーザー一覧のバージョン)。注文の書き込みは MonthlyDataVersion を +1 するので、
+変更の無い月は生成済みのファイルをそのまま返し、変更のあった月だけ
+次のダウンロード時に作り直す（古いキーのファイルは容量超過時に消える）。
+
+ファイルは LUNCH_REPORT_CACHE_DIR に置き、合計が LUNCH_REPORT_CACHE_MAX_BYTES を
+超えたら最終アクセスの古いものから削除する。
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .business_calendar import get_business_calendar
+from .db_router import replica_alias, use_replica
+from .models import LunchConfig, MonthlyDataVersion, PriceRule
+from .reports import build_monthly_report
+
+
+# レポートのレイアウトを変えたら上げる（既存のキャッシュを無効にする）
+KEY_PREFIX = 'monthly-report-v1'
+
+
+class ReportCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, name + '.xlsx')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        # 最終アクセス日時を更新（削除は古い順）
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return content
+
+    def set(self, key, content):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # 書きかけのファイルを他のプロセスに読ませないよう一時ファイル経由で置き換える
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.xlsx'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(('.xlsx', '.tmp')):
+                os.unlink(os.path.join(self.directory, name))
+
+
+def get_report_cache() -> ReportCache:
+    return ReportCache(
+        settings.LUNCH_REPORT_CACHE_DIR,
+        getattr(settings, 'LUNCH_REPORT_CACHE_MAX_BYTES', 100 * 1024 * 1024),
+    )
+
+
+def monthly_report_key(y: int, m: int) -> str:
+    cfg = LunchConfig.objects.values_list('pk', 'price', 'subsidy', 'monthly_limit').first()
+    # 料金設定は行の追加・変更・削除のいずれでも値が変わるよう件数と最終更新日時を使う
+    rules = tuple(PriceRule.objects.aggregate(n=Count('id'), t=Max('updated_at')).values())
+    data_version, users_version = MonthlyDataVersion.versions_for(y, m)
+    return ':'.join(map(str, (
+        KEY_PREFIX, y, m, cfg, rules, get_business_calendar().version, data_version, users_version,
+    )))
+
+
+def get_monthly_report(y: int, m: int, progress=None) -> bytes:
+    """y年m月の月次レポート。キャッシュにあればそれを、無ければ生成して保存する"""
+    cache = get_report_cache()
+    key = monthly_report_key(y, m)
+    content = cache.get(key)
+    if content is None:
+        # 生成はレプリカで行う。ただしレプリカが default に追いついていない
+        # （同じキーにならない）ときは古いレポートにならないよう default で作る
+        on_replica = replica_alias() is not None
+        if on_replica:
+            with use_replica():
+                on_replica = monthly_report_key(y, m) == key
+        # キーは生成前に読んだバージョンで保存する。生成中に注文が変わっても、
+        # 次のダウンロードではバージョンが進んでいるので作り直される
+        with use_replica(on_replica):
+            content = build_monthly_report(y, m, progress=progress)
+        cache.set(key, content)
+    return content
+
+
+# ── シグナル（apps.py で接続） ──
+
+def order_changed(sender, instance, **kwargs):
+    MonthlyDataVersion.bump(instance.order_date)
+
+
+def users_changed(sender, instance, update_fields=None, **kwargs):
+    # ログインのたびの last_login 更新はレポートに影響しない
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    MonthlyDataVersion.bump_users()
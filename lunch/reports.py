@@ -0,0 +1,283 @@
+"""
+レポート・FAX の生成処理。
+
+ビュー（その場でダウンロード）とバックグラウンドジョブ（run_lunch_worker）の
+両方から使うため、HTTP に依存しないバイト列を返す関数にまとめている。
+
+WeasyPrint（ネイティブライブラリの読み込みを含む）と openpyxl は重いので、
+ワーカー起動時ではなく各関数の初回呼び出し時に import する。
+起動時に読み込まれていないことは bench_startup コマンドで確認できる。
+"""
+import calendar
+import io
+import os
+from dataclasses import dataclass, field
+from datetime import date
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+
+from .business_calendar import get_business_calendar
+from .models import Order, DailyOrderCounter
+from .pricing import PriceTable
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def monthly_report_filename(y: int, m: int) -> str:
+    return f'lunch_report_{y}{m:02}.xlsx'
+
+
+def fax_filename(day: date, ext: str) -> str:
+    return day.strftime(f'lunch_order_%Y%m%d.{ext}')
+
+
+def build_fax_pdf(day: date, vendor: str = 'veg17') -> bytes:
+    """day の発注 FAX（PDF）を作ってバイト列で返す"""
+    from weasyprint import HTML
+
+    # ライス大中小それぞれの注文数（日別注文数テーブルから 1 クエリ）
+    rice = DailyOrderCounter.counts_for(day, vendor)
+    counts = {
+        'large':  rice['大'],
+        'medium': rice['中'],
+        'small':  rice['小'],
+    }
+
+    # HTML をレンダリングして PDF 化
+    html_string = render_to_string('lunch/fax_template.html', {
+        'today': day,
+        'counts': counts,
+    })
+    return HTML(string=html_string).write_pdf()
+
+
+def build_fax_excel(day: date, vendor: str = 'veg17') -> bytes:
+    """day の発注書（fax_template.xlsx に数量を書き込んだ Excel）をバイト列で返す"""
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import MergedCell
+
+    counts = DailyOrderCounter.counts_for(day, vendor)
+
+    template_path = os.path.join(
+        settings.BASE_DIR, 'lunch', 'templates', 'lunch', 'fax_template.xlsx'
+    )
+    wb = load_workbook(template_path)
+    ws = wb.active
+
+    # 書き込みたいセルと値のマッピング
+    writes = {
+        # 年月日を個別セルに
+        'B11': day.year,      # 年
+        'D11': day.month,     # 月
+        'F11': day.day,       # 日
+        'H11': counts['大'],                  # ライス大
+        'J11': counts['中'],                  # ライス中
+        'L11': counts['小'],                  # ライス小
+    }
+
+    for coord, val in writes.items():
+        cell = ws[coord]  # 例: ws['E6']
+        # MergedCell ならスキップ（またはマージ範囲の左上セルを優先）
+        if isinstance(cell, MergedCell):
+            # もしマージ範囲の左上セルを書き込みたい場合は、
+            # 下記のように範囲を探して min_row/min_col で再設定してください。
+            for m in ws.merged_cells.ranges:
+                if coord in m:
+                    tl = (m.min_row, m.min_col)
+                    ws.cell(row=tl[0], column=tl[1]).value = val
+                    break
+        else:
+            cell.value = val
+
+    # 出力
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+@dataclass
+class MonthlyTotals:
+    """y年m月の有効な注文の集計（月次レポートと report_lunch_summary コマンドで共用）"""
+    limit: int                                               # 会社負担の上限
+    user_days: dict = field(default_factory=dict)            # ユーザーID → {日: Price}（同じ日に複数あっても 1 食）
+    daily_totals: list = field(default_factory=list)         # 日ごとの注文数
+    vendor_totals: dict = field(default_factory=dict)        # ベンダー → [件数, 金額]
+    grand_price: int = 0
+    grand_subsidy: int = 0
+
+
+def monthly_totals(y: int, m: int, prices=None) -> MonthlyTotals:
+    """その月の有効な注文をまとめて 1 回で取得し、注文日時点の価格で集計する"""
+    prices = prices or PriceTable.load()
+    totals = MonthlyTotals(
+        limit=prices.monthly_limit(y, m),
+        daily_totals=[0] * calendar.monthrange(y, m)[1],
+        vendor_totals={code: [0, 0] for code, _ in Order.VENDORS},
+    )
+    month_orders = (
+        Order.objects.filter(order_date__year=y, order_date__month=m, canceled=False)
+        .order_by('order_date', 'id')
+        .values_list('user_id', 'order_date', 'vendor')
+    )
+    for user_id, order_date, vendor in month_orders:
+        p = prices.resolve(order_date, vendor)
+        totals.user_days.setdefault(user_id, {}).setdefault(order_date.day, p)
+        totals.daily_totals[order_date.day - 1] += 1
+        per_vendor = totals.vendor_totals.setdefault(vendor, [0, 0])
+        per_vendor[0] += 1
+        per_vendor[1] += p.price
+        totals.grand_price   += p.price
+        totals.grand_subsidy += p.subsidy
+    return totals
+
+
+def build_monthly_report(y: int, m: int, progress=None) -> bytes:
+    """
+    y年m月の月次ランチ注文レポート（Excel）を作ってバイト列で返す。
+    progress を渡すと 0.0〜1.0 の進捗でユーザー 1 行ごとに呼ばれる。
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+
+    # 2) ユーザー一覧と日数を取得
+    User = get_user_model()
+    users = User.objects.all().order_by('username')
+    days_in_month = calendar.monthrange(y, m)[1]
+
+    # 3) その月の注文を注文日時点の価格（料金設定）で集計
+    totals        = monthly_totals(y, m)
+    limit         = totals.limit
+    user_days     = totals.user_days
+    daily_totals  = totals.daily_totals
+    vendor_totals = totals.vendor_totals
+    grand_price   = totals.grand_price
+    grand_subsidy = totals.grand_subsidy
+
+    # 4) Excel ワークブック／シートを組み立て
+    wb = Workbook()
+    ws = wb.active
+    ws.title = f"{y}年{m}月ランチ注文"
+
+    # 4-1) ヘッダー行
+    header = ['コード','氏名'] \
+           + [f"{d}日" for d in range(1, days_in_month+1)] \
+           + ['注文数','合計金額','補助額','上限','会社負担','超過','実費']
+    ws.append(header)
+    # ヘッダー書式
+    for col in range(1, len(header)+1):
+        cell = ws.cell(row=1, column=col)
+        cell.font      = Font(bold=True)
+        cell.fill      = PatternFill("solid", fgColor="DDDDDD")
+        cell.alignment = Alignment(horizontal='center')
+
+    # 4-2) 曜日行
+    weekday_map = ['月','火','水','木','金','土','日']
+    weekday_row = ['', '']
+    for d in range(1, days_in_month+1):
+        wd = date(y, m, d).weekday()  # 0=月 … 6=日
+        weekday_row.append(weekday_map[wd])
+    weekday_row += [''] * 7
+    ws.append(weekday_row)
+    for col in range(1, len(header)+1):
+        cell = ws.cell(row=2, column=col)
+        cell.alignment = Alignment(horizontal='center')
+        cell.font = Font(italic=True)
+
+    # 4-3) 週末・祝日・休業日列リストを作成（セル番号）
+    business_cal = get_business_calendar()
+    weekend_cols = []
+    for d in range(1, days_in_month+1):
+        wd = date(y, m, d).weekday()  # 5=土, 6=日
+        if wd in (5, 6) or not business_cal.is_open(date(y, m, d)):
+            weekend_cols.append(2 + d)  # 「コード」「氏名」を飛ばして 3 列目から日付
+
+    # 4-4) 各ユーザー行を挿入
+    total_users = len(users)
+    for row_idx, user in enumerate(users, start=3):
+        if progress:
+            progress((row_idx - 3) / max(total_users, 1))
+        code = user.id
+        name = user.get_full_name() or user.username
+
+        # 日別フラグ (1 or 0)
+        ordered_days = user_days.get(user.id, {})
+        flags = [1 if d in ordered_days else 0 for d in range(1, days_in_month+1)]
+
+        # 集計列を計算（金額は注文日ごとの価格の合計）
+        total_qty     = sum(flags)
+        total_price   = sum(p.price for p in ordered_days.values())
+        total_subsidy = sum(p.subsidy for p in ordered_days.values())
+        company_pay   = min(total_subsidy, limit)
+        over          = max(0, total_subsidy - limit)
+        user_pay      = total_price - company_pay
+
+        row = [code, name] + flags + [
+            total_qty,
+            total_price,
+            total_subsidy,
+            limit,
+            company_pay,
+            over,
+            user_pay,
+        ]
+        ws.append(row)
+
+        # 4-4-1) 週末セルを灰色に
+        for col in weekend_cols:
+            cell = ws.cell(row=row_idx, column=col)
+            cell.fill = PatternFill("solid", fgColor="EEEEEE")
+
+        # 4-4-2) 通貨列にカンマ区切り書式を設定
+        base_col = 2 + days_in_month
+        for offset in range(1, 7):  # 「合計金額」から「実費」までの 6 列
+            cell = ws.cell(row=row_idx, column=base_col + offset)
+            cell.number_format = '"¥"#,##0'
+
+    # 4-5) 日別合計行を追加
+    total_row = ['', '合計']
+    total_qty     = sum(daily_totals)
+    total_price   = grand_price
+    total_subsidy = grand_subsidy
+    company_pay   = min(total_subsidy, limit)
+    over          = max(0, total_subsidy - limit)
+    user_pay      = total_price - company_pay
+
+    total_row += daily_totals + [
+        total_qty,
+        total_price,
+        total_subsidy,
+        limit,
+        company_pay,
+        over,
+        user_pay,
+    ]
+    ws.append(total_row)
+
+    # 合計行の週末セルを灰色に
+    total_row_idx = ws.max_row
+    for col in weekend_cols:
+        cell = ws.cell(row=total_row_idx, column=col)
+        cell.fill = PatternFill("solid", fgColor="EEEEEE")
+
+    # 合計行の書式（太字＆黄色背景）
+    for col in range(1, len(header)+1):
+        cell = ws.cell(row=total_row_idx, column=col)
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill("solid", fgColor="FFFF99")
+
+    # 4-6) ベンダー集計行をシート下部に追加
+    start_row = ws.max_row + 2
+    ws.cell(row=start_row, column=1, value='≪ベンダー集計≫').font = Font(bold=True)
+    for i, (code, name) in enumerate(Order.VENDORS, start=start_row+1):
+        cnt, amt = vendor_totals[code]
+        ws.cell(row=i, column=2, value=name)
+        ws.cell(row=i, column=days_in_month+3, value=cnt)
+        ws.cell(row=i, column=days_in_month+4, value=amt)
+
+    # 5) Workbook をバイト列に書き込んで返す
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
@@ -0,0 +1,88 @@
+"""
+定期注文（StandingOrder）から Order を一括で作る。
+
+対象期間の営業日について、有効な定期注文を 1 回読み込み、既に注文（キャンセル
+済みを含む）がある (ユーザー, 日付) を 1 回の問い合わせで除いてから、残りを
+bulk_create(ignore_conflicts=True) でまとめて挿入する。ignore_conflicts では
+挿入できた行が分からないので、挿入後に作るはずだった行を読み直し、
+実際にあったものだけを作成件数・変更履歴に数える（order_id も入る）。
+
+カレンダーからキャンセルされた日の注文は canceled=True の行として残るので、
+作り直さずにそのまま「その日は休み」の例外として扱われる。
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import audit
+from .business_calendar import get_business_calendar
+from .events import order_events
+from .models import DailyOrderCounter, MonthlyDataVersion, Order, StandingOrder
+
+
+@dataclass
+class MaterializeResult:
+    days: list
+    created: int
+    skipped: int   # 既に注文・キャンセルのある (ユーザー, 日付)
+
+
+def materialize_standing_orders(days, dry_run=False) -> MaterializeResult:
+    """days（日付のリスト）のうち営業日について、定期注文から Order を作る"""
+    calendar = get_business_calendar()
+    days = sorted(d for d in set(days) if calendar.is_open(d))
+    if not days:
+        return MaterializeResult(days=[], created=0, skipped=0)
+    first, last = days[0], days[-1]
+
+    standing = list(
+        StandingOrder.objects.filter(active=True, start_date__lte=last)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=first))
+        .order_by('id')
+    )
+    # 1 日 1 ユーザー 1 注文（toggle_order と同じ）。既存の行があればその日は触らない
+    existing = set(
+        Order.objects.filter(order_date__range=(first, last))
+        .values_list('user_id', 'order_date')
+    )
+
+    orders  = []
+    skipped = 0
+    for day in days:
+        for s in standing:
+            if not s.applies_to(day):
+                continue
+            key = (s.user_id, day)
+            if key in existing:
+                skipped += 1
+                continue
+            existing.add(key)   # 同じユーザーの定期注文が複数あっても先の 1 件だけ
+            orders.append(Order(
+                user_id=s.user_id,
+                order_date=day,
+                vendor=s.vendor,
+                rice_size=s.rice_size,
+                quantity=s.quantity,
+            ))
+
+    if orders and not dry_run:
+        planned = {(o.user_id, o.order_date, o.vendor, o.rice_size) for o in orders}
+        with transaction.atomic():
+            Order.objects.bulk_create(orders, ignore_conflicts=True)
+            # 挿入後に読み直す（planned は読み込み時点で注文の無かった (ユーザー, 日付) だけ）
+            inserted = [
+                o for o in Order.objects.filter(
+                    order_date__range=(first, last), user_id__in={k[0] for k in planned},
+                )
+                if (o.user_id, o.order_date, o.vendor, o.rice_size) in planned
+            ]
+            # 挿入できなかった行もあり得るので日別注文数は期間分を集計し直す
+            DailyOrderCounter.rebuild(first, last)
+            MonthlyDataVersion.bump(*days)
+            order_events.publish_after_commit(first, last)
+            for order in inserted:
+                audit.record(order, 'none', 'ordered', 'standing_order')
+        skipped += len(orders) - len(inserted)
+        return MaterializeResult(days=days, created=len(inserted), skipped=skipped)
+    return MaterializeResult(days=days, created=len(orders), skipped=skipped)
@@ -0,0 +1,121 @@
+"""
+本番用の静的ファイル配信。
+
+collectstatic 時にファイル名へ内容ハッシュを付け（ManifestStaticFilesStorage）、
+テキスト系ファイルは .gz / .br（brotli が入っている場合のみ）も同時に作っておく。
+配信時は Accept-Encoding に応じて圧縮済みファイルを返し、ハッシュ付きの
+ファイル名には Cache-Control: immutable を付けて再検証させない。
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # brotli は任意。無ければ gzip のみ作成する
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.html', '.txt', '.json', '.map', '.xml')
+# ManifestStaticFilesStorage が付ける 12 桁のハッシュ（例: site.0123456789ab.css）
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ハッシュ付きファイルの gzip / brotli 版を collectstatic 時に生成するストレージ"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        compressed = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if (hashed_name and not isinstance(processed, Exception)
+                    and hashed_name.endswith(COMPRESSIBLE_EXTENSIONS)
+                    and hashed_name not in compressed):
+                self._compress(hashed_name)
+                compressed.add(hashed_name)
+            yield name, hashed_name, processed
+
+    def _compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        # 圧縮しても小さくならないものは作らない
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gz) < len(data):
+            with open(path + '.gz', 'wb') as f:
+                f.write(gz)
+        if brotli is not None:
+            br = brotli.compress(data)
+            if len(br) < len(data):
+                with open(path + '.br', 'wb') as f:
+                    f.write(br)
+
+
+def accepted_encodings(header) -> dict:
+    """
+    Accept-Encoding を {エンコーディング: q 値} にする。q=0（br;q=0 など）は
+    「受け付けない」という意味なので含めない。'*' は列挙されていないものすべてに当たる。
+    """
+    qvalues = {}
+    for item in header.split(','):
+        name, *params = [p.strip() for p in item.split(';')]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[name.lower()] = q
+    wildcard = qvalues.pop('*', 0.0)
+    return {
+        enc: qvalues.get(enc, wildcard) for enc in ('br', 'gzip')
+        if qvalues.get(enc, wildcard) > 0
+    }
+
+
+def serve_static(request, path):
+    """
+    STATIC_ROOT 配下のファイルを配信する（DEBUG=False 時に urls.py から使う）。
+    Accept-Encoding が許せば collectstatic 時に作った .br / .gz を返す。
+    """
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404(path)
+    if not os.path.isfile(fullpath):
+        raise Http404(path)
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding = None
+    # q 値の高いものから。同じなら小さくなる br を優先する
+    for enc, suffix in sorted((('br', '.br'), ('gzip', '.gz')), key=lambda e: -accepted.get(e[0], 0)):
+        if enc in accepted and os.path.isfile(fullpath + suffix):
+            fullpath += suffix
+            encoding = enc
+            break
+
+    response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    # FileResponse が付ける Content-Disposition（圧縮版のファイル名）は不要
+    del response['Content-Disposition']
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if path.endswith(COMPRESSIBLE_EXTENSIONS):
+        patch_vary_headers(response, ('Accept-Encoding',))
+    if HASHED_NAME_RE.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        # ハッシュ無しの名前で参照された場合は短時間だけキャッシュ
+        response['Cache-Control'] = 'public, max-age=60'
+    return response
@@ -1,39 +1,58 @@
 # from datetime import date
+import asyncio
 import calendar
 import json
-import io
 import os
-from datetime import date, time, timedelta
-from django.shortcuts import render, redirect
-from django.template.loader import render_to_string
+from datetime import date, time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from weasyprint import HTML
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.http import require_POST
-from django.contrib.auth import get_user_model
-from openpyxl import Workbook
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from django.conf import settings
-from openpyxl.cell.cell import MergedCell
 
-from .models import Order
+from .models import Order, DailyOrderCounter, ReportJob
+from .reports import (
+    XLSX_CONTENT_TYPE, build_fax_excel, build_fax_pdf,
+    fax_filename, monthly_report_filename,
+)
+from .report_cache import get_monthly_report
+from .business_calendar import get_business_calendar, is_supported_year
+from .events import order_events
+from .pricing import PriceTable
+from . import audit, jobs, profiling
 
 
 def get_allowed_dates(start: date, count: int) -> set[date]:
     """
-    start日から「日曜を除く」count 日間を集めてセットで返す。
+    start日から営業日（日曜・祝日・会社休業日を除く）count 日間をセットで返す。
     """
-    allowed = set()
-    d = start
-    # count 分だけ日曜以外をcollect
-    while len(allowed) < count:
-        if d.weekday() != 6:  # 6=日曜
-            allowed.add(d)
-        d += timedelta(days=1)
-    return allowed
+    return set(get_business_calendar().next_open_days(start, count))
+
+def month_grid(year: int, month: int) -> list[list[dict]]:
+    """
+    月間カレンダーの枠（ユーザーに依存しない部分）を週ごとのリストで返す。
+    calendar.html ではフラグメントキャッシュが切れたときだけ呼ばれる。
+    """
+    business_cal = get_business_calendar()
+    cal = calendar.Calendar(firstweekday=0)
+    return [
+        [
+            {
+                'day': day,
+                'is_current_month': day.month == month,
+                'holiday': business_cal.holiday_name(day),
+            }
+            for day in week
+        ]
+        for week in cal.monthdatescalendar(year, month)
+    ]
 
 @login_required
 def monthly_calendar(request, year=None, month=None):
@@ -41,14 +60,13 @@ def monthly_calendar(request, year=None, month=None):
     today = date.today()
     year  = year or today.year
     month = month or today.month
+    if not is_supported_year(year) or not 1 <= month <= 12:
+        raise Http404
 
     # ── 追加: 許可日を計算 ──
     allowed_dates = get_allowed_dates(today, 6)
     # テンプレートでも today と allowed_dates を参照できるように渡す
 
-    cal = calendar.Calendar(firstweekday=0)
-    month_days = cal.monthdatescalendar(year, month)
-
     # ユーザーの今月の注文日をセット化
     orders = Order.objects.filter(
         user=request.user,
@@ -58,48 +76,193 @@ def monthly_calendar(request, year=None, month=None):
     ).values_list('order_date', flat=True)
     orders_set = set(orders)
 
-    # 日付ごとに「注文済みか」を付与
-    calendar_data = []
-    for week in month_days:
-        week_data = []
-        for day in week:
-            week_data.append({
-                'day': day,
-                'is_current_month': day.month == month,
-                'ordered': day in orders_set,
-                'allowed': day in allowed_dates,
-            })
-        calendar_data.append(week_data)
+    # 前月・次月（年をまたぐ場合も考慮）
+    prev_year, prev_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
 
+    # 月の枠はテンプレート側でキャッシュし、ユーザーごとの
+    # 「注文済み」「変更可能」だけを calendar.js で反映する
     return render(request, 'lunch/calendar.html', {
-        'calendar_data': calendar_data,
+        'calendar_data': lambda: month_grid(year, month),
+        'grid_version': get_business_calendar().version,
         'year': year,
         'month': month,
+        'prev_year': prev_year,
+        'prev_month': prev_month,
+        'next_year': next_year,
+        'next_month': next_month,
         'today': today,
         'allowed_dates': allowed_dates,
+        'calendar_state': {
+            'ordered': sorted(d.isoformat() for d in orders_set),
+            'allowed': sorted(d.isoformat() for d in allowed_dates),
+        },
     })
-def fax_order_pdf(request):
-    # 今日は何件注文があるか集計
-    today = date.today()
-    qs = Order.objects.filter(order_date=today, canceled=False)
-    # ライスの大中小それぞれ注文数を仮に集計する例
-    counts = {
-        'large':  qs.filter(rice_size='大').count(),
-        'medium': qs.filter(rice_size='中').count(),
-        'small':  qs.filter(rice_size='小').count(),
+def month_bitmasks(days) -> list[int]:
+    """日付の集まりを月ごとの 31 ビット整数（bit0 = 1 日 … bit30 = 31 日）12 個にする"""
+    masks = [0] * 12
+    for month, day in days:
+        masks[month - 1] |= 1 << (day - 1)
+    return masks
+
+def year_state(user, year: int) -> dict:
+    """年間カレンダー用のデータ（注文済みの日と休業日を月ごとのビットマスクで）"""
+    # 1 年分の注文済みの (月, 日) をまとめて 1 回で取得する
+    ordered = Order.objects.filter(
+        user=user, order_date__year=year, canceled=False,
+    ).values_list('order_date__month', 'order_date__day').distinct()
+    business_cal = get_business_calendar()
+    open_days = set(business_cal.open_days_between(date(year, 1, 1), date(year, 12, 31)))
+    closed = [
+        (m, d)
+        for m in range(1, 13)
+        for d in range(1, calendar.monthrange(year, m)[1] + 1)
+        if date(year, m, d) not in open_days
+    ]
+    return {
+        'year': year,
+        'ordered': month_bitmasks(ordered),
+        'closed': month_bitmasks(closed),
     }
 
-    # HTML をレンダリングして PDF 化
-    html_string = render_to_string('lunch/fax_template.html', {
-        'today': today,
-        'counts': counts,
+@login_required
+def year_calendar(request, year=None):
+    """年間カレンダー（12 か月分の注文済みの日を 1 画面で表示）"""
+    year = year or date.today().year
+    if not is_supported_year(year):
+        raise Http404
+    return render(request, 'lunch/year.html', {
+        'year': year,
+        'year_state': year_state(request.user, year),
     })
-    html = HTML(string=html_string)
-    pdf = html.write_pdf()
+
+@login_required
+def year_orders(request, year):
+    """
+    GET → { "year": 2025, "ordered": [12 個の整数], "closed": [12 個の整数] }
+    各整数は月ごとのビットマスク（bit0 = 1 日）。年間カレンダーの年切り替えで使う
+    """
+    if not is_supported_year(year):
+        return JsonResponse({'error': 'invalid year'}, status=400)
+    return JsonResponse(year_state(request.user, year))
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+
+def parse_history_cursor(value):
+    """'2025-04-01.1234'（注文日.ID）形式のカーソルを (date, id) にする。不正なら ValueError"""
+    day, _, pk = value.partition('.')
+    return date.fromisoformat(day), int(pk)
+
+
+def history_cursor(order_date, pk):
+    return f'{order_date.isoformat()}.{pk}'
+
+
+def order_history_page(user, before=None, after=None, limit=HISTORY_PAGE_SIZE) -> dict:
+    """
+    user の注文履歴の 1 ページ（新しい順）。before/after は (注文日, ID) のカーソルで、
+    before ならそれより古い、after ならそれより新しい limit 件を返す。
+    OFFSET を使わず (user, order_date, id) のインデックスを直接引くので、
+    何ページ目でも読む行数は limit + 1 件だけ。
+    """
+    qs = Order.objects.filter(user=user).values(
+        'id', 'order_date', 'vendor', 'rice_size', 'quantity', 'status', 'canceled',
+    )
+    if after is not None:
+        d, pk = after
+        # order_date >= d で範囲を絞ってから同じ日の ID を比べる（インデックスの範囲検索になる）
+        qs = qs.filter(order_date__gte=d).exclude(order_date=d, id__lte=pk)
+        rows = list(qs.order_by('order_date', 'id')[:limit + 1])
+        has_newer = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_older = True
+    else:
+        if before is not None:
+            d, pk = before
+            qs = qs.filter(order_date__lte=d).exclude(order_date=d, id__gte=pk)
+        rows = list(qs.order_by('-order_date', '-id')[:limit + 1])
+        has_older = len(rows) > limit
+        rows = rows[:limit]
+        has_newer = before is not None
+
+    prices   = PriceTable.load()
+    vendors  = dict(Order.VENDORS)
+    statuses = dict(Order._meta.get_field('status').choices)
+    orders = []
+    for r in rows:
+        price = prices.resolve(r['order_date'], r['vendor']).price
+        orders.append({
+            'id':           r['id'],
+            'date':         r['order_date'].isoformat(),
+            'vendor':       r['vendor'],
+            'vendor_label': vendors.get(r['vendor'], r['vendor']),
+            'rice_size':    r['rice_size'],
+            'quantity':     r['quantity'],
+            'price':        price * r['quantity'],
+            'status':       'canceled' if r['canceled'] else r['status'],
+            'status_label': 'キャンセル' if r['canceled'] else statuses.get(r['status'], r['status']),
+        })
+    return {
+        'orders': orders,
+        'next': history_cursor(rows[-1]['order_date'], rows[-1]['id']) if rows and has_older else None,
+        'prev': history_cursor(rows[0]['order_date'], rows[0]['id']) if rows and has_newer else None,
+    }
+
+
+def _history_args(request):
+    """GET の before / after / limit を読む。不正なら ValueError"""
+    before = request.GET.get('before')
+    after  = request.GET.get('after')
+    if before and after:
+        raise ValueError('before と after は同時に指定できません')
+    limit = int(request.GET.get('limit', HISTORY_PAGE_SIZE))
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        raise ValueError('limit が範囲外です')
+    return {
+        'before': parse_history_cursor(before) if before else None,
+        'after':  parse_history_cursor(after) if after else None,
+        'limit':  limit,
+    }
+
+@login_required
+def order_history(request):
+    """自分の注文履歴（全期間、新しい順にページ送り）"""
+    try:
+        args = _history_args(request)
+    except ValueError:
+        return redirect('order_history')
+    return render(request, 'lunch/history.html', order_history_page(request.user, **args))
+
+@login_required
+def order_history_api(request):
+    """
+    GET ?before=<cursor>|after=<cursor>&limit=20 →
+    { "orders": [...], "next": "2025-04-01.1234" | null, "prev": ... | null }
+    next を before に渡すと続き（古い方）、prev を after に渡すと前のページを返す
+    """
+    try:
+        args = _history_args(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(order_history_page(request.user, **args))
+
+def _fax_vendor(request):
+    """?vendor= の値（省略時は veg17）。知らないベンダーなら None"""
+    vendor = request.GET.get('vendor', 'veg17')
+    return vendor if vendor in dict(Order.VENDORS) else None
+
+def fax_order_pdf(request):
+    today = date.today()
+    vendor = _fax_vendor(request)
+    if vendor is None:
+        return HttpResponse('ベンダーが不正です。', status=400, content_type='text/plain; charset=utf-8')
+    pdf = build_fax_pdf(today, vendor)
 
     # レスポンスで返却
     response = HttpResponse(pdf, content_type='application/pdf')
-    filename = today.strftime('lunch_order_%Y%m%d.pdf')
+    filename = fax_filename(today, 'pdf')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
@@ -111,39 +274,92 @@ def today_order(request):
 
     # まず、当日の注文レコードをキャンセルフラグに関係なく取得
     order = Order.objects.filter(user=user, order_date=today).first()
-    
+
     if request.method == 'POST':
         action = request.POST.get('action')
-        if action == 'order':
-            if not order:
-                # レコード自体がなければ新規作成
-                Order.objects.create(user=user, order_date=today, vendor='veg17', rice_size='中')
+        if action == 'order' and not order:
+            # レコード自体がなければ新規作成
+            with transaction.atomic():
+                order = Order.objects.create(user=user, order_date=today, vendor='veg17', rice_size='中')
+                DailyOrderCounter.add(today, 'veg17', '中', 1)
+            audit.record(order, 'none', 'ordered', 'today_order', user)
+            transaction.on_commit(lambda: order_events.publish(today))
+        elif action in ('order', 'cancel') and order and order.status != 'pending':
+            messages.error(request, '既に発注済のため変更できません')
+        elif action in ('order', 'cancel') and order:
+            # 画面表示時の version と一致するときだけ切り替える（別タブ・二重送信対策）
+            try:
+                order.version = int(request.POST.get('version', order.version))
+            except ValueError:
+                pass
+            old_state = audit.state_of(order)
+            if order.set_canceled(action == 'cancel'):
+                # 既にその状態だった（二重送信など）なら何も記録しない
+                if audit.state_of(order) != old_state:
+                    audit.record(order, old_state, audit.state_of(order), 'today_order', user)
+                    transaction.on_commit(lambda: order_events.publish(today))
             else:
-                # 既存レコードがあるならキャンセルフラグをオフに
-                order.canceled = False
-                order.canceled_at = None
-                order.save()
-        elif action == 'cancel' and order:
-            # キャンセルするときはフラグをオンにして日時を埋める
-            order.canceled = True
-            order.canceled_at = timezone.now()
-            order.save()
+                messages.warning(request, '他の画面で注文状況が変更されていたため、最新の状態を表示しています')
         return redirect('today_order')
 
     # ★キャンセル済みの場合はテンプレート上では「注文なし扱い」にする
     order_for_template = order if order and not order.canceled else None
     return render(request, 'lunch/today_order.html', {
         'order': order_for_template,
+        'version': order.version if order else 0,
         'today': today,
     })
+
+# 冪等キーを受け付けて処理中であることを示す値（処理後は (status, 応答 JSON) に置き換える）
+IDEMPOTENCY_PENDING = 'pending'
+
 @login_required
 @require_POST
 def toggle_order(request):
     """
-    POST JSON { "date": "YYYY-MM-DD" }
+    POST JSON { "date": "YYYY-MM-DD", "version": 3 }
     → その日の注文レコードを必ず取得 or 作成し、canceled フラグをトグル
+    version（省略可）が現在値と異なる場合は 409 と最新の状態を返す
+
+    POST JSON { "date": "YYYY-MM-DD", "ordered": true, "key": "..." }
+    → 「注文する／しない」の目標状態を指定（calendar.js が連続クリックをまとめて送る）。
+    既にその状態なら何も書き込まない。key（冪等キー）が直近に処理済みのものなら
+    処理し直さずに前回の応答を返す
     """
-    data = json.loads(request.body)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'invalid json'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'invalid json'}, status=400)
+
+    key = data.get('key') or request.headers.get('Idempotency-Key')
+    if not key:
+        return _toggle_order(request, data)
+    if not isinstance(key, str) or len(key) > 64:
+        return JsonResponse({'error': 'invalid key'}, status=400)
+
+    idem_cache = caches['idempotency']
+    cache_key  = f'lunch:toggle:{request.user.pk}:{key}'
+    # add() は既にあれば失敗する → 同じキーの 2 回目以降（処理中を含む）
+    if not idem_cache.add(cache_key, IDEMPOTENCY_PENDING):
+        stored = idem_cache.get(cache_key)
+        if stored is None or stored == IDEMPOTENCY_PENDING:
+            return JsonResponse({'status': 'in_progress', 'date': data.get('date')}, status=409)
+        status, payload = stored
+        response = JsonResponse(payload, status=status)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    try:
+        response = _toggle_order(request, data)
+    except BaseException:
+        idem_cache.delete(cache_key)
+        raise
+    idem_cache.set(cache_key, (response.status_code, json.loads(response.content)))
+    return response
+
+def _toggle_order(request, data):
     try:
         day = date.fromisoformat(data['date'])
     except Exception:
@@ -151,35 +367,121 @@ def toggle_order(request):
 
     # 当日9:00以降は締め切り
     now = timezone.localtime()
-    # 当日から日曜除く6日以外は変更不可
+    # 当日から営業日6日以外は変更不可
     allowed = get_allowed_dates(date.today(), 6)
     if day not in allowed:
         return JsonResponse({'error': '変更可能期間外です'}, status=403)
 
     if now.time() >= time(8, 10) and day == date.today():
         return JsonResponse({'error': '受付は午前9時までです'}, status=403)
-    # get_or_create ならレコードがなければ作ってくれる
-    order, created = Order.objects.get_or_create(
-        user=request.user,
-        order_date=day,
-        defaults={'vendor': 'veg17', 'rice_size': '中'}
-    )
+
+    # 目標状態の指定（省略時は従来どおりのトグル）
+    desired = data.get('ordered')
+    if desired is not None and not isinstance(desired, bool):
+        return JsonResponse({'error': 'invalid ordered'}, status=400)
+
+    if desired is False:
+        # 取り消し指定で注文が無ければ、レコードを作らずにそのまま返す
+        order = Order.objects.filter(user=request.user, order_date=day).first()
+        if order is None:
+            return JsonResponse({'status': 'canceled', 'date': data['date'], 'version': 0})
+        created = False
+    else:
+        # get_or_create ならレコードがなければ作ってくれる
+        with transaction.atomic():
+            order, created = Order.objects.get_or_create(
+                user=request.user,
+                order_date=day,
+                defaults={'vendor': 'veg17', 'rice_size': '中'}
+            )
+            if created:
+                DailyOrderCounter.add(day, order.vendor, order.rice_size, 1)
+    if created:
+        # 新規作成 = 注文
+        audit.record(order, 'none', 'ordered', 'toggle_order', request.user)
+        transaction.on_commit(lambda: order_events.publish(day))
+        return JsonResponse({'status': 'ordered', 'date': data['date'], 'version': order.version})
+
+    if desired is not None and order.canceled != desired:
+        # 既に目標の状態 → 書き込み不要
+        status = 'canceled' if order.canceled else 'ordered'
+        return JsonResponse({'status': status, 'date': data['date'], 'version': order.version})
 
     # 事務がステータスを発注済にした後は変更不可
-    if hasattr(order, 'status') and order.status != 'pending':
+    if order.status != 'pending':
         return JsonResponse({'error': '既に発注済のため変更できません'}, status=403)
-    # トグル処理
-    if order.canceled:
-        order.canceled = False
-        order.canceled_at = None
-        status = 'ordered'
-    else:
-        order.canceled = True
-        order.canceled_at = timezone.now()
-        status = 'canceled'
 
-    order.save()
-    return JsonResponse({'status': status, 'date': data['date']})
+    # クライアントが表示中の version を送ってきた場合は、それを基準に比較する
+    # （目標状態の指定では最新の状態を基準にするので version は使わない）
+    if 'version' in data and desired is None:
+        try:
+            order.version = int(data['version'])
+        except (TypeError, ValueError):
+            return JsonResponse({'error': 'invalid version'}, status=400)
+
+    # トグル処理（version が一致したときだけ更新）
+    old_state = audit.state_of(order)
+    if not order.set_canceled(not order.canceled):
+        # 他のタブ・二重クリックで先に更新されていた → 最新の状態を返して再同期させる
+        order.refresh_from_db(fields=['canceled', 'status', 'version'])
+        if desired is not None and order.canceled != desired:
+            # 先に更新した側と目標が同じだった
+            status = 'canceled' if order.canceled else 'ordered'
+            return JsonResponse({'status': status, 'date': data['date'], 'version': order.version})
+        return JsonResponse({
+            'status': 'conflict',
+            'date': data['date'],
+            'ordered': not order.canceled,
+            'version': order.version,
+        }, status=409)
+
+    audit.record(order, old_state, audit.state_of(order), 'toggle_order', request.user)
+    transaction.on_commit(lambda: order_events.publish(day))
+    status = 'canceled' if order.canceled else 'ordered'
+    return JsonResponse({'status': status, 'date': data['date'], 'version': order.version})
+
+
+@staff_member_required
+def order_dashboard(request):
+    """当日の注文数をリアルタイム表示する事務用ダッシュボード"""
+    counts = order_events.current()
+    return render(request, 'lunch/dashboard.html', {
+        'counts': counts,
+        'vendor_rows': [(code, name, counts['vendors'].get(code, 0)) for code, name in Order.VENDORS],
+        'rice_rows': [(code, name, counts['rice_sizes'].get(code, 0)) for code, name in Order.RICE_SIZES],
+    })
+
+
+@staff_member_required
+async def order_dashboard_stream(request):
+    """
+    当日の注文数を Server-Sent Events で配信する（ASGI で動かすこと）。
+    集計はワーカー内の order_events が変更時にまとめて 1 回だけ行う。
+    """
+    snapshot = await sync_to_async(order_events.current)()
+    queue = order_events.subscribe()
+
+    def event(data):
+        return f'event: counts\ndata: {json.dumps(data)}\n\n'
+
+    async def stream():
+        try:
+            yield event(snapshot)
+            while True:
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # プロキシに切断されないよう定期的にコメント行を送る
+                    yield ': keepalive\n\n'
+                else:
+                    yield event(data)
+        finally:
+            order_events.unsubscribe(queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @staff_member_required
@@ -189,229 +491,125 @@ def download_monthly_report(request, year=None, month=None):
     GET パラメータ ?year=YYYY&month=MM があればそれを使い、なければ本日を基準に出力。
     レスポンスとして Excel ファイルを返却する。
     """
-    # 1) リクエストから年月を取得（なければ本日）
+    # 1) リクエストから年月を取得（なければ本日）。数値でなければ 400、範囲外なら 404
     today = date.today()
-    y = int(request.GET.get('year', year or today.year))
-    m = int(request.GET.get('month', month or today.month))
+    try:
+        y = int(request.GET.get('year', year or today.year))
+        m = int(request.GET.get('month', month or today.month))
+    except ValueError:
+        return HttpResponse('年月が不正です。', status=400, content_type='text/plain; charset=utf-8')
+    if not is_supported_year(y) or not 1 <= m <= 12:
+        raise Http404
 
-    # 2) LunchConfig を取得 or デフォルト作成
-    cfg, created = LunchConfig.objects.get_or_create(
-        defaults={'price': 430, 'subsidy': 230, 'monthly_limit': 3780}
-    )
-    if not created and cfg.price != 430:
-        # 既存レコードの単価が古いままなら上書き
-        cfg.price = 430
-        cfg.save()
-
-    # 3) ユーザー一覧と日数を取得
-    User = get_user_model()
-    users = User.objects.all().order_by('username')
-    days_in_month = calendar.monthrange(y, m)[1]
-
-    # 4) Excel ワークブック／シートを組み立て
-    wb = Workbook()
-    ws = wb.active
-    ws.title = f"{y}年{m}月ランチ注文"
-
-    # 4-1) ヘッダー行
-    header = ['コード','氏名'] \
-           + [f"{d}日" for d in range(1, days_in_month+1)] \
-           + ['注文数','合計金額','補助額','上限','会社負担','超過','実費']
-    ws.append(header)
-    # ヘッダー書式
-    for col in range(1, len(header)+1):
-        cell = ws.cell(row=1, column=col)
-        cell.font      = Font(bold=True)
-        cell.fill      = PatternFill("solid", fgColor="DDDDDD")
-        cell.alignment = Alignment(horizontal='center')
-
-    # 4-2) 曜日行
-    weekday_map = ['月','火','水','木','金','土','日']
-    weekday_row = ['', '']
-    for d in range(1, days_in_month+1):
-        wd = date(y, m, d).weekday()  # 0=月 … 6=日
-        weekday_row.append(weekday_map[wd])
-    weekday_row += [''] * 7
-    ws.append(weekday_row)
-    for col in range(1, len(header)+1):
-        cell = ws.cell(row=2, column=col)
-        cell.alignment = Alignment(horizontal='center')
-        cell.font = Font(italic=True)
-
-    # 4-3) 週末列リストを作成（セル番号）
-    weekend_cols = []
-    for d in range(1, days_in_month+1):
-        wd = date(y, m, d).weekday()  # 5=土, 6=日
-        if wd in (5, 6):
-            weekend_cols.append(2 + d)  # 「コード」「氏名」を飛ばして 3 列目から日付
-
-    # 4-4) 各ユーザー行を挿入
-    for row_idx, user in enumerate(users, start=3):
-        code = user.id
-        name = user.get_full_name() or user.username
-
-        # 日別フラグ (1 or 0)
-        flags = [
-            1 if Order.objects.filter(
-                    user=user,
-                    order_date=date(y, m, d),
-                    canceled=False
-               ).exists() else 0
-            for d in range(1, days_in_month+1)
-        ]
+    content = get_monthly_report(y, m)
 
-        # 集計列を計算
-        total_qty     = sum(flags)
-        total_price   = total_qty * cfg.price
-        total_subsidy = total_qty * cfg.subsidy
-        limit         = cfg.monthly_limit
-        company_pay   = min(total_subsidy, limit)
-        over          = max(0, total_subsidy - limit)
-        user_pay      = total_price - company_pay
-
-        row = [code, name] + flags + [
-            total_qty,
-            total_price,
-            total_subsidy,
-            limit,
-            company_pay,
-            over,
-            user_pay,
-        ]
-        ws.append(row)
-
-        # 4-4-1) 週末セルを灰色に
-        for col in weekend_cols:
-            cell = ws.cell(row=row_idx, column=col)
-            cell.fill = PatternFill("solid", fgColor="EEEEEE")
-
-        # 4-4-2) 通貨列にカンマ区切り書式を設定
-        base_col = 2 + days_in_month
-        for offset in range(1, 7):  # 「合計金額」から「実費」までの 6 列
-            cell = ws.cell(row=row_idx, column=base_col + offset)
-            cell.number_format = '"¥"#,##0'
-
-    # 4-5) 日別合計行を追加
-    total_row = ['', '合計']
-    # 日別合計を計算
-    daily_totals = []
-    for d in range(1, days_in_month+1):
-        cnt = Order.objects.filter(
-            order_date=date(y, m, d),
-            canceled=False
-        ).count()
-        daily_totals.append(cnt)
-    total_qty     = sum(daily_totals)
-    total_price   = total_qty * cfg.price
-    total_subsidy = total_qty * cfg.subsidy
-    limit         = cfg.monthly_limit
-    company_pay   = min(total_subsidy, limit)
-    over          = max(0, total_subsidy - limit)
-    user_pay      = total_price - company_pay
-
-    total_row += daily_totals + [
-        total_qty,
-        total_price,
-        total_subsidy,
-        limit,
-        company_pay,
-        over,
-        user_pay,
-    ]
-    ws.append(total_row)
-
-    # 合計行の週末セルを灰色に
-    total_row_idx = ws.max_row
-    for col in weekend_cols:
-        cell = ws.cell(row=total_row_idx, column=col)
-        cell.fill = PatternFill("solid", fgColor="EEEEEE")
-
-    # 合計行の書式（太字＆黄色背景）
-    for col in range(1, len(header)+1):
-        cell = ws.cell(row=total_row_idx, column=col)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill("solid", fgColor="FFFF99")
-
-    # 4-6) ベンダー集計行をシート下部に追加
-    start_row = ws.max_row + 2
-    ws.cell(row=start_row, column=1, value='≪ベンダー集計≫').font = Font(bold=True)
-    for i, (code, name) in enumerate(Order.VENDORS, start=start_row+1):
-        qs = Order.objects.filter(
-            order_date__year=y,
-            order_date__month=m,
-            vendor=code,
-            canceled=False
-        )
-        cnt = qs.count()
-        amt = sum(o.price for o in qs)
-        ws.cell(row=i, column=2, value=name)
-        ws.cell(row=i, column=days_in_month+3, value=cnt)
-        ws.cell(row=i, column=days_in_month+4, value=amt)
-
-    # 5) Workbook をバイト列に書き込み、HttpResponse で返す
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-
-    filename = f'lunch_report_{y}{m:02}.xlsx'
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    filename = monthly_report_filename(y, m)
+    response = HttpResponse(content, content_type=XLSX_CONTENT_TYPE)
     # ブラウザ側でダウンロードさせるヘッダー
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return 
+    return response
 
-@login_required
-def fax_order_excel(request):
+@staff_member_required
+@require_POST
+def enqueue_job(request):
+    """
+    レポート・FAX の生成をバックグラウンドジョブとして登録する。
+    POST kind=monthly_report&year=YYYY&month=MM
+         kind=fax_pdf|fax_excel&date=YYYY-MM-DD&vendor=veg17
+    → 202 { "id": 1, "status_url": ... }
+    """
+    kind = request.POST.get('kind')
     today = date.today()
-    qs = Order.objects.filter(order_date=today, canceled=False)
-    counts = {
-        '大': qs.filter(rice_size='大').count(),
-        '中': qs.filter(rice_size='中').count(),
-        '小': qs.filter(rice_size='小').count(),
-    }
+    if kind == 'monthly_report':
+        try:
+            params = {
+                'year':  int(request.POST.get('year', today.year)),
+                'month': int(request.POST.get('month', today.month)),
+            }
+        except ValueError:
+            return JsonResponse({'error': 'invalid year/month'}, status=400)
+    elif kind in ('fax_pdf', 'fax_excel'):
+        try:
+            day = date.fromisoformat(request.POST.get('date', today.isoformat()))
+        except ValueError:
+            return JsonResponse({'error': 'invalid date'}, status=400)
+        params = {'date': day.isoformat(), 'vendor': request.POST.get('vendor', 'veg17')}
+    else:
+        return JsonResponse({'error': 'invalid kind'}, status=400)
 
-    template_path = os.path.join(
-        settings.BASE_DIR, 'lunch', 'templates', 'lunch', 'fax_template.xlsx'
-    )
-    wb = load_workbook(template_path)
-    ws = wb.active
-
-    # 書き込みたいセルと値のマッピング
-    writes = {
-        # 年月日を個別セルに
-        'B11': today.year,      # 年
-        'D11': today.month,     # 月
-        'F11': today.day,       # 日
-        'H11': counts['大'],                  # ライス大
-        'J11': counts['中'],                  # ライス中
-        'L11': counts['小'],                  # ライス小
+    try:
+        job = jobs.enqueue(kind, params, request.user)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'status_url': reverse('job_status', args=[job.pk]),
+    }, status=202)
+
+
+@staff_member_required
+def job_status(request, job_id):
+    """ジョブの状態と進捗（ポーリング用）"""
+    job = get_object_or_404(ReportJob, pk=job_id)
+    data = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
     }
+    if job.status == 'done':
+        data['download_url'] = reverse('job_download', args=[job.pk])
+    elif job.status == 'failed':
+        # トレースバックの最終行だけ返す（全文は管理画面で確認）
+        data['error'] = job.error.strip().splitlines()[-1] if job.error else ''
+    return JsonResponse(data)
 
-    for coord, val in writes.items():
-        cell = ws[coord]  # 例: ws['E6']
-        # MergedCell ならスキップ（またはマージ範囲の左上セルを優先）
-        if isinstance(cell, MergedCell):
-            # もしマージ範囲の左上セルを書き込みたい場合は、
-            # 下記のように範囲を探して min_row/min_col で再設定してください。
-            for m in ws.merged_cells.ranges:
-                if coord in m:
-                    tl = (m.min_row, m.min_col)
-                    ws.cell(row=tl[0], column=tl[1]).value = val
-                    break
-        else:
-            cell.value = val
-
-    # 出力
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    filename = today.strftime('lunch_order_%Y%m%d.xlsx')
-    r = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+
+@staff_member_required
+def job_download(request, job_id):
+    """完了したジョブの出力ファイルをダウンロード"""
+    job = get_object_or_404(ReportJob, pk=job_id, status='done')
+    if not job.output:
+        raise Http404('出力ファイルがありません')
+    return FileResponse(job.output.open('rb'), as_attachment=True, filename=job.filename)
+
+
+@staff_member_required
+def profile_list(request):
+    """保存済みのリクエストプロファイル一覧（profiling.py）"""
+    directory = getattr(settings, 'LUNCH_PROFILE_DIR', None)
+    return render(request, 'admin/profiles.html', {
+        'title': 'リクエストプロファイル',
+        'enabled': bool(directory),
+        'profiles': profiling.list_profiles(directory) if directory else [],
+    })
+
+
+@staff_member_required
+def profile_download(request, name, ext):
+    """プロファイルのダウンロード（.prof）または表示（.txt）"""
+    directory = getattr(settings, 'LUNCH_PROFILE_DIR', None)
+    if not directory or not profiling.NAME_RE.match(name):
+        raise Http404(name)
+    path = os.path.join(directory, f'{name}.{ext}')
+    if not os.path.isfile(path):
+        raise Http404(name)
+    if ext == 'txt':
+        return FileResponse(open(path, 'rb'), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.prof')
+
+
+@login_required
+def fax_order_excel(request):
+    today = date.today()
+    vendor = _fax_vendor(request)
+    if vendor is None:
+        return HttpResponse('ベンダーが不正です。', status=400, content_type='text/plain; charset=utf-8')
+    content = build_fax_excel(today, vendor)
+
+    filename = fax_filename(today, 'xlsx')
+    r = HttpResponse(content, content_type=XLSX_CONTENT_TYPE)
     r['Content-Disposition'] = f'attachment; filename="{filename}"'
     return r
 # def fax_order_excel(request):
@@ -0,0 +1,118 @@
+// static/js/calendar.js
+// 月間カレンダーの日付クリックで注文をトグルする（calendar.html から読み込み）
+// CSRF トークン取得 （Django 標準の方法）
+function getCookie(name) {
+  let cookieValue = null;
+  if (document.cookie && document.cookie !== '') {
+    document.cookie.split(';').forEach(c => {
+      const [k, v] = c.trim().split('=');
+      if (k === name) cookieValue = decodeURIComponent(v);
+    });
+  }
+  return cookieValue;
+}
+const csrftoken = getCookie('csrftoken');
+
+const calendarTable = document.getElementById('order-calendar');
+const toggleUrl = calendarTable.dataset.toggleUrl;
+
+// キャッシュされた月の枠に、ユーザーごとの「注文済み」「変更可能」を反映
+const calendarState = JSON.parse(document.getElementById('calendar-state').textContent);
+const orderedDates = new Set(calendarState.ordered);
+const allowedDates = new Set(calendarState.allowed);
+
+function showOrdered(td, ordered) {
+  td.classList.toggle('ordered', ordered);
+  td.querySelector('.status-text').textContent = ordered ? '注文済' : '';
+}
+
+// 連続クリックは DEBOUNCE_MS の間まとめ、最後の「注文する／しない」だけを送る
+const DEBOUNCE_MS = 300;
+
+function newKey() {
+  if (window.crypto && crypto.randomUUID) {
+    return crypto.randomUUID();
+  }
+  return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
+// 日付ごとの送信状態
+//   confirmed: サーバーで確定している状態 / desired: 画面上の（ユーザーが望む）状態
+function makeSync(td, date, ordered) {
+  const sync = { confirmed: ordered, desired: ordered, timer: null, inFlight: false };
+
+  function send(key, retried) {
+    sync.inFlight = true;
+    const target = sync.desired;
+    fetch(toggleUrl, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'X-CSRFToken': csrftoken,
+      },
+      body: JSON.stringify({ date: date, ordered: target, key: key }),
+    })
+    .then(res => res.json())
+    .then(data => {
+      sync.inFlight = false;
+      if (data.status === 'ordered' || data.status === 'canceled') {
+        sync.confirmed = data.status === 'ordered';
+      } else if (data.status === 'conflict') {
+        // 別タブ等で先に変更されていた → サーバーの状態に合わせる
+        sync.confirmed = sync.desired = data.ordered;
+      } else if (data.error) {
+        sync.desired = sync.confirmed;
+        alert(data.error);
+      }
+      // 送信中にさらにクリックされていたら、その結果をもう一度送る
+      if (sync.desired !== sync.confirmed) {
+        schedule();
+      }
+      showOrdered(td, sync.desired);
+    })
+    .catch(() => {
+      // 通信エラーは同じキーで 1 回だけ再送（サーバー側で二重処理されない）
+      if (!retried) {
+        send(key, true);
+        return;
+      }
+      sync.inFlight = false;
+      sync.desired = sync.confirmed;
+      showOrdered(td, sync.confirmed);
+      alert('通信に失敗しました。時間をおいて再度お試しください');
+    });
+  }
+
+  function schedule() {
+    clearTimeout(sync.timer);
+    sync.timer = setTimeout(() => {
+      if (sync.inFlight) {
+        return;   // 応答を受け取った時点で改めて送る
+      }
+      if (sync.desired !== sync.confirmed) {
+        send(newKey(), false);
+      }
+    }, DEBOUNCE_MS);
+  }
+
+  sync.click = () => {
+    sync.desired = !sync.desired;
+    showOrdered(td, sync.desired);
+    schedule();
+  };
+  return sync;
+}
+
+calendarTable.querySelectorAll('.day-cell').forEach(td => {
+  const date = td.dataset.date;
+  if (orderedDates.has(date)) {
+    showOrdered(td, true);
+  }
+  if (!allowedDates.has(date)) {
+    return;
+  }
+  td.classList.remove('disabled');
+  td.style.cursor = 'pointer';
+  const sync = makeSync(td, date, orderedDates.has(date));
+  td.addEventListener('click', sync.click);
+});
@@ -0,0 +1,31 @@
+// static/js/dashboard.js
+// 当日の注文数を Server-Sent Events で受け取り、ダッシュボードに反映する
+const dashboard = document.getElementById('order-dashboard');
+const statusText = dashboard.querySelector('[data-status]');
+const source = new EventSource(dashboard.dataset.streamUrl);
+
+source.addEventListener('counts', e => {
+  const counts = JSON.parse(e.data);
+  document.getElementById('dashboard-date').textContent = counts.date;
+  dashboard.querySelector('[data-total]').textContent = counts.total;
+  Object.entries(counts.vendors).forEach(([code, n]) => {
+    const cell = dashboard.querySelector(`[data-vendor="${code}"]`);
+    if (cell) cell.textContent = n;
+  });
+  Object.entries(counts.rice_sizes).forEach(([code, n]) => {
+    const cell = dashboard.querySelector(`[data-rice-size="${code}"]`);
+    if (cell) cell.textContent = n;
+  });
+  statusText.textContent = '最終更新: ' + new Date().toLocaleTimeString();
+});
+
+source.addEventListener('error', () => {
+  if (source.readyState === EventSource.CLOSED) {
+    // 503（同時接続数の上限）などで接続できなかった → 自動では再接続されないので時間をおいて読み直す
+    statusText.textContent = '混み合っています。30 秒後に再接続します';
+    setTimeout(() => location.reload(), 30000);
+    return;
+  }
+  // EventSource は自動で再接続する
+  statusText.textContent = '再接続中…';
+});
@@ -0,0 +1,94 @@
+// static/js/year.js
+// 年間カレンダー（year.html から読み込み）
+// サーバーからは月ごとのビットマスク（bit0 = 1日）だけを受け取り、表はここで組み立てる
+const container = document.getElementById('year-calendar');
+const WEEKDAYS = ['月', '火', '水', '木', '金', '土', '日'];
+
+// URL テンプレート中の年（と月）の 0 / 1 を置き換える
+function yearUrl(template, year) {
+  return template.replace(/\/0\/$/, `/${year}/`);
+}
+function monthUrl(year, month) {
+  return container.dataset.monthUrl.replace(/\/0\/1\/$/, `/${year}/${month}/`);
+}
+
+function countBits(mask) {
+  let n = 0;
+  while (mask) {
+    n += mask & 1;
+    mask >>>= 1;
+  }
+  return n;
+}
+
+function renderMonth(year, month, ordered, closed) {
+  const table = document.createElement('table');
+  table.className = 'year-month';
+  const caption = table.createCaption();
+  const link = document.createElement('a');
+  link.href = monthUrl(year, month);
+  link.textContent = `${month}月`;
+  caption.appendChild(link);
+
+  const head = table.insertRow();
+  WEEKDAYS.forEach(w => {
+    const th = document.createElement('th');
+    th.textContent = w;
+    head.appendChild(th);
+  });
+
+  const days = new Date(year, month, 0).getDate();
+  // 月曜始まりで 1 日の前を空ける
+  const offset = (new Date(year, month - 1, 1).getDay() + 6) % 7;
+  let row = head;
+  for (let i = 0; i < offset + days; i++) {
+    if (i % 7 === 0) {
+      row = table.insertRow();
+    }
+    const td = row.insertCell();
+    if (i < offset) {
+      continue;
+    }
+    const day = i - offset + 1;
+    const bit = 1 << (day - 1);
+    td.textContent = day;
+    if (ordered & bit) td.classList.add('ordered');
+    if (closed & bit) td.classList.add('closed');
+  }
+  return table;
+}
+
+function render(state) {
+  container.replaceChildren(
+    ...state.ordered.map((mask, i) => renderMonth(state.year, i + 1, mask, state.closed[i]))
+  );
+  document.getElementById('year-label').textContent = state.year;
+  const total = state.ordered.reduce((n, mask) => n + countBits(mask), 0);
+  document.getElementById('year-total').textContent = `（注文 ${total} 日）`;
+  currentYear = state.year;
+}
+
+let currentYear = null;
+
+function loadYear(year) {
+  fetch(yearUrl(container.dataset.apiUrl, year))
+    .then(res => res.json())
+    .then(state => {
+      if (state.error) {
+        return;
+      }
+      render(state);
+      history.replaceState(null, '', yearUrl(container.dataset.pageUrl, year));
+    });
+}
+
+document.getElementById('prev-year').addEventListener('click', e => {
+  e.preventDefault();
+  loadYear(currentYear - 1);
+});
+document.getElementById('next-year').addEventListener('click', e => {
+  e.preventDefault();
+  loadYear(currentYear + 1);
+});
+
+render(JSON.parse(document.getElementById('year-state').textContent));